@@ -0,0 +1,116 @@
+import math
+import threading
+import time
+from functools import wraps
+
+from flask import current_app
+
+import metrics
+
+# --- Admission control ---
+# Each worker process serves WEB_THREADS requests at a time, and every
+# request holds one thread and one pooled DB connection. A few slow
+# reports (the full stock ledger, lead-time simulations, archive-wide
+# order lists) could hold all of them while shop-floor transitions wait.
+# Routes marked @admit('heavy') or @admit('critical') share a per-process
+# limit for their class (only the expensive variants of a route are heavy,
+# e.g. the dashboard list only when it includes the archive):
+#   limit    how many run at once
+#   queue    how many may wait for a slot; beyond that the request is
+#            refused immediately with 503 + Retry-After
+#   timeout  how long one may wait before it is refused the same way
+# Keep heavy's limit + queue below WEB_THREADS so some threads are always
+# free for everything else. Unmarked routes are not limited. Waits are
+# reported as admission.<class>.wait_ms in /api/metrics, next to the
+# admitted / rejected / timed_out counters.
+
+DEFAULT_CLASSES = {
+    'critical': {'limit': 4, 'queue': 32, 'timeout': 10.0},
+    'heavy': {'limit': 1, 'queue': 2, 'timeout': 5.0},
+}
+
+class AdmissionRejected(Exception):
+    """Raised when a request's class has no slot and no room in its queue."""
+
+    def __init__(self, priority, retry_after):
+        super().__init__(priority)
+        self.retry_after = retry_after
+
+class PriorityClass:
+    def __init__(self, name, limit, queue, timeout):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.retry_after = max(1, math.ceil(timeout))
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+
+    def acquire(self):
+        started = time.perf_counter()
+        with self._cond:
+            # A free slot only goes to a newcomer if nobody is waiting for it.
+            if self.active >= self.limit or self.waiting:
+                if self.waiting >= self.queue:
+                    metrics.incr(f'admission.{self.name}.rejected')
+                    raise AdmissionRejected(self.name, self.retry_after)
+                self.waiting += 1
+                try:
+                    admitted = self._cond.wait_for(lambda: self.active < self.limit, self.timeout)
+                finally:
+                    self.waiting -= 1
+                if not admitted:
+                    metrics.incr(f'admission.{self.name}.timed_out')
+                    raise AdmissionRejected(self.name, self.retry_after)
+            self.active += 1
+        metrics.incr(f'admission.{self.name}.admitted')
+        metrics.observe(f'admission.{self.name}.wait_ms', (time.perf_counter() - started) * 1000)
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+class AdmissionControl:
+    def __init__(self, classes=None):
+        self.classes = {}
+        self._configure(classes or DEFAULT_CLASSES)
+
+    def _configure(self, classes):
+        self.classes = {name: PriorityClass(name, **settings) for name, settings in classes.items()}
+
+    def init_app(self, app):
+        classes = {}
+        for name, settings in DEFAULT_CLASSES.items():
+            prefix = f'ADMISSION_{name.upper()}_'
+            classes[name] = {key: app.config.get(prefix + key.upper(), default) for key, default in settings.items()}
+        self._configure(classes)
+        app.extensions['admission'] = self
+
+    def stats(self):
+        return {name: {'active': c.active, 'waiting': c.waiting, 'limit': c.limit, 'queue': c.queue}
+                for name, c in self.classes.items()}
+
+def admit(priority, when=None):
+    """Run the view only once a slot of the `priority` class is free (or answer 503).
+
+    `when` (called in the request) limits this to the expensive variants of a
+    route; requests for which it returns False run unlimited.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if when is not None and not when():
+                return view(*args, **kwargs)
+            priority_class = current_app.extensions['admission'].classes[priority]
+            try:
+                priority_class.acquire()
+            except AdmissionRejected as e:
+                return 'Server is busy, please try again in a moment.', 503, {'Retry-After': str(e.retry_after)}
+            try:
+                return view(*args, **kwargs)
+            finally:
+                priority_class.release()
+        return wrapper
+    return decorator
@@ -1,52 +1,117 @@
-import os
-from flask import Flask, render_template, request, redirect, url_for, flash
+import atexit
+import time
+from flask import Flask, Blueprint, current_app, render_template, request, redirect, url_for, flash, jsonify
 import mysql.connector
-from dotenv import load_dotenv
+import metrics
+from config import configs
+import db
+from db import get_db_connection, dispose_pools
+from queries import (MO_STATUSES, MO_HEADER_SQL, MO_COMPONENTS_SQL, MO_WORK_ORDERS_SQL, MO_HISTORY_SQL,
+                     LOG_MO_STATUS_SQL, mark_component_availability, build_mo_list_query,
+                     archived, build_stock_ledger_query)
+from json_provider import FastJSONProvider, columnar
+import http_cache
+from fragment_cache import FragmentCache
+from jobs import ReorderQueue
+from costing import CostEngine, CENT
+from admission import AdmissionControl, admit
+import read_models
+import archive
+import migrate
+import explain_queries
+import duration_stats
+import lead_times
+from http_cache import conditional, bump_versions
+from user_cache import UserCache
+from password_hashing import PasswordHasher, HashingBusy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-from flask_bcrypt import Bcrypt
 from datetime import datetime
 
-load_dotenv()
-
-app = Flask(__name__)
-
-app.secret_key = 'your_super_secret_key_change_this'
-bcrypt = Bcrypt(app)
-login_manager = LoginManager(app)
-login_manager.login_view = 'login'
-
-# --- Database Connection and User Loader (No Changes) ---
-def get_db_connection():
-    conn = mysql.connector.connect(
-        host=os.getenv('DB_HOST'),
-        user=os.getenv('DB_USER'),
-        password=os.getenv('DB_PASSWORD'),
-        database=os.getenv('DB_NAME')
-    )
-    return conn
-
+# Extensions are created unbound and attached to an app in create_app(), so a
+# WSGI server can build the app once (preload) and fork workers from it.
+bp = Blueprint('main', __name__)
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
+user_cache = UserCache()
+password_hasher = PasswordHasher()
+fragment_cache = FragmentCache()
+reorder_queue = ReorderQueue()
+cost_engine = CostEngine()
+admission = AdmissionControl()
+
+def create_app(config=None):
+    """Build the Flask app. `config` is a config name, a config class or a dict of overrides."""
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    if config is None or isinstance(config, str):
+        config = configs[config or 'development']
+    if isinstance(config, dict):
+        app.config.from_object(configs['development'])
+        app.config.update(config)
+    else:
+        app.config.from_object(config)
+    if not app.config.get('SECRET_KEY'):
+        raise RuntimeError('SECRET_KEY must be set')
+
+    db.init_app(app)
+    login_manager.init_app(app)
+    user_cache.init_app(app)
+    password_hasher.init_app(app)
+    http_cache.init_app(app)
+    fragment_cache.init_app(app)
+    read_models.init_app(app)
+    migrate.init_app(app)
+    explain_queries.init_app(app)
+    archive.init_app(app)
+    reorder_queue.init_app(app)
+    cost_engine.init_app(app)
+    admission.init_app(app)
+    app.register_blueprint(bp)
+    return app
+
+def shutdown():
+    """Release per-process resources; called on worker exit."""
+    password_hasher.shutdown(wait=False)
+    reorder_queue.shutdown()
+    dispose_pools()
+
+atexit.register(shutdown)
+
+WORK_ORDERS_PER_PAGE = 50
+WORK_ORDER_STATUSES = ['To Do', 'In Progress', 'Done']
+
+# --- User Loader ---
 class User(UserMixin):
-    def __init__(self, id, name, email):
+    def __init__(self, id, name, email, role=None):
         self.id = id
         self.name = name
         self.email = email
+        self.role = role
 
 @login_manager.user_loader
 def load_user(user_id):
+    # Signed session claims are trusted until their TTL runs out, so most
+    # requests (including the dashboard's JSON polling) never touch the DB here.
+    claims = user_cache.lookup(user_id)
+    if claims:
+        return User(id=claims['id'], name=claims['name'], email=claims['email'], role=claims['role'])
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM users WHERE id = %s", (user_id,))
+    cursor.execute("SELECT id, name, email, role FROM users WHERE id = %s", (user_id,))
     user_data = cursor.fetchone()
     cursor.close()
     conn.close()
+    user_cache.record_db_hit()
     if user_data:
-        return User(id=user_data['id'], name=user_data['name'], email=user_data['email'])
+        user_cache.store(user_data)
+        return User(id=user_data['id'], name=user_data['name'], email=user_data['email'], role=user_data['role'])
+    user_cache.clear_session()
     return None
 
 # --- Main Routes and Helpers (No Changes) ---
-@app.route('/')
+@bp.route('/')
 def index():
-    return redirect(url_for('list_manufacturing_orders'))
+    return redirect(url_for('main.list_manufacturing_orders'))
 
 def check_component_availability(cursor, orders):
     product_stock = {}
@@ -71,48 +136,40 @@ def check_component_availability(cursor, orders):
     return orders
 
 def log_mo_status_change(cursor, mo_id, status):
-    cursor.execute(
-        "INSERT INTO manufacturing_order_status_history (mo_id, status, timestamp) VALUES (%s, %s, %s)",
-        (mo_id, status, datetime.now())
-    )
+    cursor.execute(LOG_MO_STATUS_SQL, (mo_id, status, datetime.now()))
+
+def invalidate_mo_fragments(mo_id):
+    # Drop the cached dashboard row and KPI cards of an MO whose status changed
+    fragment_cache.invalidate('mo_row', int(mo_id))
+    fragment_cache.invalidate('kpi_card', 'all')
+    fragment_cache.invalidate('kpi_card', 'my')
+
+def include_archive():
+    # Pages read hot data only; ?archive=1 adds the archived orders / ledger rows.
+    return request.args.get('archive') == '1'
+
+def fetch_mo_header(cursor, mo_id):
+    """Returns (order, sql) where sql(query) points a MO_* query at the tables the order lives in."""
+    cursor.execute(MO_HEADER_SQL, (mo_id,))
+    order = cursor.fetchone()
+    if order is not None:
+        return order, lambda query: query
+    # Finished orders moved out by `flask archive` stay viewable.
+    cursor.execute(archived(MO_HEADER_SQL), (mo_id,))
+    order = cursor.fetchone()
+    if order is not None:
+        order['archived'] = True
+    return order, archived
 
 def get_mo_data_for_json(cursor, mo_id):
     """Helper function to get all MO data for JSON responses"""
-    cursor.execute("""
-        SELECT mo.*, p.name AS product_name, b.name AS bom_name, u.name AS assignee_name
-        FROM manufacturing_orders mo
-        JOIN products p ON mo.product_id = p.id
-        LEFT JOIN boms b ON mo.bom_id = b.id
-        LEFT JOIN users u ON mo.assignee_id = u.id
-        WHERE mo.id = %s
-    """, (mo_id,))
-    order = cursor.fetchone()
-    
-    cursor.execute("""
-        SELECT p.name AS component_name, p.on_hand_quantity, (bc.quantity_required * mo.quantity_to_produce) AS to_consume
-        FROM manufacturing_orders mo
-        JOIN bom_components bc ON mo.bom_id = bc.bom_id
-        JOIN products p ON bc.component_product_id = p.id
-        WHERE mo.id = %s
-    """, (mo_id,))
-    components = cursor.fetchall()
-    for comp in components:
-        comp['availability_status'] = 'Available' if comp['on_hand_quantity'] >= comp['to_consume'] else 'Not Available'
-    
-    cursor.execute("""
-        SELECT wo.*, wc.name AS work_center_name
-        FROM work_orders wo
-        JOIN work_centers wc ON wo.work_center_id = wc.id
-        WHERE wo.mo_id = %s
-    """, (mo_id,))
+    order, sql = fetch_mo_header(cursor, mo_id)
+    cursor.execute(sql(MO_COMPONENTS_SQL), (mo_id,))
+    components = mark_component_availability(cursor.fetchall())
+    cursor.execute(sql(MO_WORK_ORDERS_SQL), (mo_id,))
     work_orders = cursor.fetchall()
-    
-    cursor.execute(
-        "SELECT status, timestamp FROM manufacturing_order_status_history WHERE mo_id = %s ORDER BY timestamp",
-        (mo_id,)
-    )
+    cursor.execute(sql(MO_HISTORY_SQL), (mo_id,))
     status_history = cursor.fetchall()
-    
     return {
         'order': order,
         'components': components,
@@ -121,10 +178,11 @@ def get_mo_data_for_json(cursor, mo_id):
     }
 
 # --- REPLACED PRODUCT ROUTES ---
-@app.route('/products')
+@bp.route('/products')
 @login_required
+@conditional('products')
 def list_products():
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     cursor = conn.cursor(dictionary=True)
     cursor.execute('SELECT * FROM products')
     products = cursor.fetchall()
@@ -132,46 +190,22 @@ def list_products():
     conn.close()
     return render_template('products.html', products=products)
 
-# Make sure to import jsonify at the top of your app.py file
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-
 # ADD THIS NEW API ROUTE
-@app.route('/api/manufacturing-orders')
+@bp.route('/api/manufacturing-orders')
 @login_required
+@conditional('manufacturing_orders', 'products', 'bom_components')
+@admit('heavy', when=include_archive)
 def api_manufacturing_orders():
     # This code is copied and adapted from your list_manufacturing_orders function
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     cursor = conn.cursor(dictionary=True)
 
     active_filter = request.args.get('filter', 'All')
     search_query = request.args.get('search', '')
     filter_owner = request.args.get('owner', 'all')
     
-    base_query = "SELECT mo.id, mo.schedule_start_date, mo.quantity_to_produce, mo.status, mo.bom_id, p.name as product_name FROM manufacturing_orders mo JOIN products p ON mo.product_id = p.id"
-    where_clauses = []
-    params = []
-    
-    if filter_owner == 'my':
-        where_clauses.append("mo.assignee_id = %s")
-        params.append(current_user.id)
-    if active_filter in ['Draft', 'Confirmed', 'In Progress', 'Done']:
-        where_clauses.append("mo.status = %s")
-        params.append(active_filter)
-    elif active_filter == 'Late':
-        where_clauses.append("mo.schedule_start_date < CURDATE() AND mo.status = 'Confirmed'")
-    elif active_filter == 'Not Assigned':
-        where_clauses.append("mo.assignee_id IS NULL")
-    
-    if search_query:
-        where_clauses.append("(p.name LIKE %s OR mo.status LIKE %s OR mo.id LIKE %s)")
-        search_term = f"%{search_query}%"
-        params.extend([search_term, search_term, search_query.replace('MO-', '')])
-
-    if where_clauses:
-        base_query += " WHERE " + " AND ".join(where_clauses)
-    base_query += " ORDER BY mo.schedule_start_date DESC"
-    
-    cursor.execute(base_query, tuple(params))
+    base_query, params = build_mo_list_query(active_filter, search_query, filter_owner, current_user.id, include_archive())
+    cursor.execute(base_query, params)
     manufacturing_orders = cursor.fetchall()
     
     manufacturing_orders = check_component_availability(cursor, manufacturing_orders)
@@ -179,15 +213,23 @@ def api_manufacturing_orders():
     cursor.close()
     conn.close()
 
-    # Convert date objects to strings for JSON compatibility
-    for order in manufacturing_orders:
-        if order.get('schedule_start_date'):
-            order['schedule_start_date'] = order['schedule_start_date'].strftime('%Y-%m-%d')
-
-    # Instead of rendering a template, return the data as JSON
+    # Dates and decimals are encoded by the app's JSON provider; ?format=columnar
+    # sends column names once and each order as a plain array.
+    if request.args.get('format') == 'columnar':
+        return jsonify(columnar(manufacturing_orders))
     return jsonify(manufacturing_orders)
 
-@app.route('/products/<int:product_id>/edit', methods=['GET', 'POST'])
+@bp.route('/api/manufacturing-orders/<int:mo_id>')
+@login_required
+def api_manufacturing_order(mo_id):
+    conn = get_db_connection(read_only=True)
+    cursor = conn.cursor(dictionary=True)
+    data = get_mo_data_for_json(cursor, mo_id)
+    cursor.close()
+    conn.close()
+    return jsonify(data)
+
+@bp.route('/products/<int:product_id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_product(product_id):
     conn = get_db_connection()
@@ -199,18 +241,22 @@ def edit_product(product_id):
         description = request.form['description']
         min_stock = request.form['min_stock_level']
         reorder_qty = request.form['reorder_quantity']
+        unit_cost = request.form['unit_cost']
         
         cursor.execute("""
             UPDATE products 
-            SET name = %s, description = %s, min_stock_level = %s, reorder_quantity = %s
+            SET name = %s, description = %s, min_stock_level = %s, reorder_quantity = %s, unit_cost = %s
             WHERE id = %s
-        """, (name, description, min_stock, reorder_qty, product_id))
+        """, (name, description, min_stock, reorder_qty, unit_cost, product_id))
+        read_models.rename_product(cursor, product_id, name)
         
         conn.commit()
+        bump_versions(conn, 'products', 'bom_costs')
+        cost_engine.set_product(conn, product_id, name, unit_cost)
         flash(f"Product '{name}' updated successfully.", 'success')
         cursor.close()
         conn.close()
-        return redirect(url_for('list_products'))
+        return redirect(url_for('main.list_products'))
     
     # --- This part handles SHOWING the form ---
     cursor.execute("SELECT * FROM products WHERE id = %s", (product_id,))
@@ -221,7 +267,7 @@ def edit_product(product_id):
     return render_template('product_edit_form.html', product=product)
 
 # NEW: Replaces the old 'add_product' function
-@app.route('/products/update', methods=['GET', 'POST'])
+@bp.route('/products/update', methods=['GET', 'POST'])
 @login_required
 def update_stock():
     if request.method == 'POST':
@@ -231,7 +277,9 @@ def update_stock():
         
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM products WHERE LOWER(name) = LOWER(%s)", (product_name,))
+        # The column collation is case-insensitive; LOWER() would defeat idx_products_name.
+        # FOR UPDATE: a background reorder must not land between the read and the write.
+        cursor.execute("SELECT * FROM products WHERE name = %s FOR UPDATE", (product_name,))
         product = cursor.fetchone()
 
         if product:
@@ -239,8 +287,8 @@ def update_stock():
             new_quantity = product['on_hand_quantity'] + quantity_change
             if new_quantity < 0:
                 flash(f"Error: Cannot remove {abs(quantity_change)} units. Only {product['on_hand_quantity']} units of {product_name} are in stock.", 'error')
-                return redirect(url_for('list_products'))
-            cursor.execute("UPDATE products SET on_hand_quantity = %s WHERE id = %s", (new_quantity, product_id))
+                return redirect(url_for('main.list_products'))
+            cursor.execute("UPDATE products SET on_hand_quantity = on_hand_quantity + %s WHERE id = %s", (quantity_change, product_id))
             reason = "Manual Stock Addition" if quantity_change > 0 else "Manual Stock Removal"
             cursor.execute("INSERT INTO stock_ledger (product_id, quantity_change, reason) VALUES (%s, %s, %s)", (product_id, quantity_change, reason))
             flash(f"Updated stock for {product_name}. New quantity: {new_quantity}", 'success')
@@ -253,13 +301,14 @@ def update_stock():
              flash(f"Error: Cannot remove stock from '{product_name}' because it does not exist.", 'error')
 
         conn.commit()
+        bump_versions(conn, 'products', 'stock_ledger')
         cursor.close()
         conn.close()
-        return redirect(url_for('list_products'))
+        return redirect(url_for('main.list_products'))
     return render_template('update_stock_form.html')
 
 # NEW: Function to delete a product
-@app.route('/products/<int:product_id>/delete', methods=['POST'])
+@bp.route('/products/<int:product_id>/delete', methods=['POST'])
 @login_required
 def delete_product(product_id):
     conn = get_db_connection()
@@ -267,20 +316,21 @@ def delete_product(product_id):
     try:
         cursor.execute("DELETE FROM products WHERE id = %s", (product_id,))
         conn.commit()
+        bump_versions(conn, 'products')
         flash("Product deleted successfully.", 'success')
     except mysql.connector.Error as err:
         flash("Error: Cannot delete this product because it is being used in a Bill of Materials or a Manufacturing Order.", 'error')
     finally:
         cursor.close()
         conn.close()
-    return redirect(url_for('list_products'))
+    return redirect(url_for('main.list_products'))
 
 # --- All other routes (Work Centers, BOMs, MOs, etc.) remain the same ---
 # (The rest of the file is unchanged)
-@app.route('/work-centers')
+@bp.route('/work-centers')
 @login_required
 def list_work_centers():
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     cursor = conn.cursor(dictionary=True)
     cursor.execute('SELECT * FROM work_centers')
     work_centers = cursor.fetchall()
@@ -288,7 +338,7 @@ def list_work_centers():
     conn.close()
     return render_template('work_centers.html', work_centers=work_centers)
 
-@app.route('/work-centers/add', methods=['GET', 'POST'])
+@bp.route('/work-centers/add', methods=['GET', 'POST'])
 @login_required
 def add_work_center():
     if request.method == 'POST':
@@ -298,17 +348,45 @@ def add_work_center():
         cursor = conn.cursor()
         cursor.execute('INSERT INTO work_centers (name, cost_per_hour) VALUES (%s, %s)',
                        (name, cost))
+        work_center_id = cursor.lastrowid
         conn.commit()
+        bump_versions(conn, 'work_centers', 'bom_costs')
+        cost_engine.set_rate(conn, work_center_id, cost)
         cursor.close()
         conn.close()
-        return redirect(url_for('list_work_centers'))
+        return redirect(url_for('main.list_work_centers'))
     return render_template('work_center_form.html')
 
-@app.route('/boms')
+@bp.route('/work-centers/<int:work_center_id>/edit', methods=['GET', 'POST'])
 @login_required
-def list_boms():
+def edit_work_center(work_center_id):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
+    if request.method == 'POST':
+        name = request.form['name']
+        cost = request.form['cost_per_hour']
+        cursor.execute('UPDATE work_centers SET name = %s, cost_per_hour = %s WHERE id = %s',
+                       (name, cost, work_center_id))
+        read_models.rename_work_center(cursor, work_center_id, name)
+        conn.commit()
+        bump_versions(conn, 'work_centers', 'bom_costs')
+        cost_engine.set_rate(conn, work_center_id, cost)
+        flash(f"Work center '{name}' updated successfully.", 'success')
+        cursor.close()
+        conn.close()
+        return redirect(url_for('main.list_work_centers'))
+    cursor.execute('SELECT * FROM work_centers WHERE id = %s', (work_center_id,))
+    work_center = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return render_template('work_center_form.html', work_center=work_center)
+
+@bp.route('/boms')
+@login_required
+@conditional('boms', 'products')
+def list_boms():
+    conn = get_db_connection(read_only=True)
+    cursor = conn.cursor(dictionary=True)
     cursor.execute("""
         SELECT b.id, b.name AS bom_name, p.name AS product_name
         FROM boms b
@@ -319,7 +397,7 @@ def list_boms():
     conn.close()
     return render_template('boms.html', boms=boms)
 
-@app.route('/boms/add', methods=['GET', 'POST'])
+@bp.route('/boms/add', methods=['GET', 'POST'])
 @login_required
 def add_bom():
     if request.method == 'POST':
@@ -330,9 +408,11 @@ def add_bom():
         cursor.execute('INSERT INTO boms (name, product_id) VALUES (%s, %s)', (name, product_id))
         new_bom_id = cursor.lastrowid
         conn.commit()
+        bump_versions(conn, 'boms', 'bom_costs')
+        cost_engine.add_bom(conn, new_bom_id, name, int(product_id))
         cursor.close()
         conn.close()
-        return redirect(url_for('bom_detail', bom_id=new_bom_id))
+        return redirect(url_for('main.bom_detail', bom_id=new_bom_id))
     
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
@@ -342,16 +422,16 @@ def add_bom():
     conn.close()
     return render_template('bom_form.html', products=products)
 
-@app.route('/boms/<int:bom_id>')
+@bp.route('/boms/<int:bom_id>')
 @login_required
 def bom_detail(bom_id):
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     cursor = conn.cursor(dictionary=True)
     cursor.execute("SELECT b.id, b.name AS bom_name, p.name AS product_name FROM boms b JOIN products p ON b.product_id = p.id WHERE b.id = %s", (bom_id,))
     bom = cursor.fetchone()
-    cursor.execute("SELECT bc.quantity_required, p.name AS component_name FROM bom_components bc JOIN products p ON bc.component_product_id = p.id WHERE bc.bom_id = %s", (bom_id,))
+    cursor.execute("SELECT bc.component_product_id, bc.quantity_required, p.name AS component_name FROM bom_components bc JOIN products p ON bc.component_product_id = p.id WHERE bc.bom_id = %s", (bom_id,))
     components = cursor.fetchall()
-    cursor.execute("SELECT bo.name AS operation_name, bo.duration_minutes, wc.name AS work_center_name FROM bom_operations bo JOIN work_centers wc ON bo.work_center_id = wc.id WHERE bo.bom_id = %s", (bom_id,))
+    cursor.execute("SELECT bo.name AS operation_name, bo.work_center_id, bo.duration_minutes, wc.name AS work_center_name FROM bom_operations bo JOIN work_centers wc ON bo.work_center_id = wc.id WHERE bo.bom_id = %s", (bom_id,))
     operations = cursor.fetchall()
     cursor.execute('SELECT * FROM products')
     all_products = cursor.fetchall()
@@ -359,23 +439,96 @@ def bom_detail(bom_id):
     all_work_centers = cursor.fetchall()
     cursor.close()
     conn.close()
-    return render_template('bom_detail.html', bom=bom, components=components, operations=operations, all_products=all_products, all_work_centers=all_work_centers)
+    cost_engine.sync()
+    cost = cost_engine.bom_cost(bom_id)
+    for comp in components:
+        unit_cost = cost_engine.unit_cost(comp['component_product_id'])
+        comp['line_cost'] = None if unit_cost is None else (unit_cost * comp['quantity_required']).quantize(CENT)
+    for op in operations:
+        op['cost'] = (cost_engine.rate(op['work_center_id']) * op['duration_minutes'] / 60).quantize(CENT)
+    return render_template('bom_detail.html', bom=bom, components=components, operations=operations, all_products=all_products, all_work_centers=all_work_centers, cost=cost)
 
-@app.route('/boms/<int:bom_id>/add_component', methods=['POST'])
+@bp.route('/api/bom-costs')
+@login_required
+@conditional('bom_costs')
+@admit('heavy', when=lambda: not request.args.get('ids'))
+def api_bom_costs():
+    """Rolled-up cost of every BOM (or of ?ids=1,2,3); ?format=columnar as for the MO list."""
+    cost_engine.sync()
+    ids = request.args.get('ids')
+    bom_ids = [int(i) for i in ids.split(',') if i.strip().isdigit()] if ids else None
+    costs = cost_engine.all_costs(bom_ids)
+    if request.args.get('format') == 'columnar':
+        return jsonify(columnar(costs))
+    return jsonify(costs)
+
+@bp.route('/api/operation-durations')
+@login_required
+@conditional('operation_duration_stats', 'bom_operations', 'work_centers')
+def api_operation_durations():
+    """Planned vs observed operation durations; ?all=1 lists operations within tolerance too."""
+    conn = get_db_connection(read_only=True)
+    cursor = conn.cursor(dictionary=True)
+    report = duration_stats.drift_report(
+        cursor,
+        min_samples=max(request.args.get('min_samples', 5, type=int), 1),
+        threshold=request.args.get('threshold', 15, type=float) / 100,
+        include_all=request.args.get('all') == '1'
+    )
+    cursor.close()
+    conn.close()
+    if request.args.get('format') == 'columnar':
+        return jsonify(columnar(report))
+    return jsonify(report)
+
+@bp.route('/api/lead-times')
+@login_required
+@admit('heavy')
+def api_lead_times():
+    """Simulated P50/P90 completion of every open MO; ?by=<ISO date/time> adds the chance of finishing by then."""
+    config = current_app.config
+    trials = request.args.get('trials', config.get('LEAD_TIME_TRIALS', 2000), type=int)
+    trials = min(max(trials, 100), config.get('LEAD_TIME_MAX_TRIALS', 20000))
+    by = request.args.get('by')
+    try:
+        by = datetime.fromisoformat(by) if by else None
+    except ValueError:
+        return jsonify({'error': 'by must be an ISO date or date-time'}), 400
+    if by is not None and by.tzinfo is not None:
+        # The simulation runs on the server's naive local clock, like the DB timestamps.
+        by = by.astimezone().replace(tzinfo=None)
+    conn = get_db_connection(read_only=True)
+    cursor = conn.cursor(dictionary=True)
+    started = time.perf_counter()
+    report = lead_times.forecast(cursor, trials=trials, by=by, seed=request.args.get('seed', type=int))
+    metrics.observe('lead_times.simulate_ms', (time.perf_counter() - started) * 1000)
+    cursor.close()
+    conn.close()
+    if request.args.get('format') == 'columnar':
+        return jsonify(columnar(report))
+    return jsonify(report)
+
+@bp.route('/boms/<int:bom_id>/add_component', methods=['POST'])
 @login_required
 def add_component_to_bom(bom_id):
-    product_id = request.form['product_id']
+    product_id = int(request.form['product_id'])
     quantity = request.form['quantity']
+    cost_engine.sync()
+    if cost_engine.would_cycle(bom_id, product_id):
+        flash("That component is (or contains) the product this BOM makes.", 'error')
+        return redirect(url_for('main.bom_detail', bom_id=bom_id))
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute('INSERT INTO bom_components (bom_id, component_product_id, quantity_required) VALUES (%s, %s, %s)',
                    (bom_id, product_id, quantity))
     conn.commit()
+    bump_versions(conn, 'bom_components', 'bom_costs')
+    cost_engine.refresh_bom(conn, bom_id)
     cursor.close()
     conn.close()
-    return redirect(url_for('bom_detail', bom_id=bom_id))
+    return redirect(url_for('main.bom_detail', bom_id=bom_id))
 
-@app.route('/boms/<int:bom_id>/add_operation', methods=['POST'])
+@bp.route('/boms/<int:bom_id>/add_operation', methods=['POST'])
 @login_required
 def add_operation_to_bom(bom_id):
     operation_name = request.form['operation_name']
@@ -386,18 +539,21 @@ def add_operation_to_bom(bom_id):
     cursor.execute('INSERT INTO bom_operations (bom_id, name, work_center_id, duration_minutes) VALUES (%s, %s, %s, %s)',
                    (bom_id, operation_name, work_center_id, duration))
     conn.commit()
+    bump_versions(conn, 'bom_operations', 'bom_costs')
+    cost_engine.refresh_bom(conn, bom_id)
     cursor.close()
     conn.close()
-    return redirect(url_for('bom_detail', bom_id=bom_id))
+    return redirect(url_for('main.bom_detail', bom_id=bom_id))
 
-@app.route('/manufacturing-orders')
+@bp.route('/manufacturing-orders')
 @login_required
+@conditional('manufacturing_orders', 'products', 'bom_components')
+@admit('heavy', when=include_archive)
 def list_manufacturing_orders():
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     cursor = conn.cursor(dictionary=True)
     kpi_counts = {}
-    statuses = ['Draft', 'Confirmed', 'In Progress', 'Done']
-    for status in statuses:
+    for status in MO_STATUSES:
         cursor.execute("SELECT COUNT(*) as count FROM manufacturing_orders WHERE status = %s", (status,))
         kpi_counts[status] = cursor.fetchone()['count']
     cursor.execute("SELECT COUNT(*) as count FROM manufacturing_orders")
@@ -415,34 +571,15 @@ def list_manufacturing_orders():
     active_filter = request.args.get('filter', 'All')
     search_query = request.args.get('search', '')
     filter_owner = request.args.get('owner', 'all')
-    base_query = "SELECT mo.id, mo.schedule_start_date, mo.quantity_to_produce, mo.status, mo.bom_id, p.name as product_name FROM manufacturing_orders mo JOIN products p ON mo.product_id = p.id"
-    where_clauses = []
-    params = []
-    if filter_owner == 'my':
-        where_clauses.append("mo.assignee_id = %s")
-        params.append(current_user.id)
-    if active_filter in statuses:
-        where_clauses.append("mo.status = %s")
-        params.append(active_filter)
-    elif active_filter == 'Late':
-        where_clauses.append("mo.schedule_start_date < CURDATE() AND mo.status = 'Confirmed'")
-    elif active_filter == 'Not Assigned':
-        where_clauses.append("mo.assignee_id IS NULL")
-    if search_query:
-        where_clauses.append("(p.name LIKE %s OR mo.status LIKE %s OR mo.id LIKE %s)")
-        search_term = f"%{search_query}%"
-        params.extend([search_term, search_term, search_query.replace('MO-', '')])
-    if where_clauses:
-        base_query += " WHERE " + " AND ".join(where_clauses)
-    base_query += " ORDER BY mo.schedule_start_date DESC"
-    cursor.execute(base_query, tuple(params))
+    base_query, params = build_mo_list_query(active_filter, search_query, filter_owner, current_user.id, include_archive())
+    cursor.execute(base_query, params)
     manufacturing_orders = cursor.fetchall()
     manufacturing_orders = check_component_availability(cursor, manufacturing_orders)
     cursor.close()
     conn.close()
-    return render_template('dashboard.html', manufacturing_orders=manufacturing_orders, kpi_counts=kpi_counts, my_kpi_counts=my_kpi_counts, active_filter=active_filter, filter_owner=filter_owner, search_query=search_query)
+    return render_template('dashboard.html', manufacturing_orders=manufacturing_orders, kpi_counts=kpi_counts, my_kpi_counts=my_kpi_counts, active_filter=active_filter, filter_owner=filter_owner, search_query=search_query, include_archive=include_archive())
 
-@app.route('/manufacturing-orders/add', methods=['GET', 'POST'])
+@bp.route('/manufacturing-orders/add', methods=['GET', 'POST'])
 @login_required
 def add_manufacturing_order():
     if request.method == 'POST':
@@ -462,13 +599,15 @@ def add_manufacturing_order():
         operations = cursor.fetchall()
         for op in operations:
             cursor.execute(
-                'INSERT INTO work_orders (mo_id, operation_name, work_center_id, status, duration_minutes) VALUES (%s, %s, %s, %s, %s)',
-                (mo_id, op['name'], op['work_center_id'], 'To Do', op['duration_minutes'])
+                'INSERT INTO work_orders (mo_id, operation_name, work_center_id, status, duration_minutes, bom_operation_id) VALUES (%s, %s, %s, %s, %s, %s)',
+                (mo_id, op['name'], op['work_center_id'], 'To Do', op['duration_minutes'], op['id'])
             )
+        read_models.refresh_mo(cursor, mo_id)
         conn.commit()
+        bump_versions(conn, 'manufacturing_orders', 'work_orders', 'manufacturing_order_status_history')
         cursor.close()
         conn.close()
-        return redirect(url_for('list_manufacturing_orders'))
+        return redirect(url_for('main.list_manufacturing_orders'))
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     cursor.execute('SELECT * FROM products')
@@ -481,113 +620,55 @@ def add_manufacturing_order():
 
 
 
-@app.route('/manufacturing-orders/<int:mo_id>')
+@bp.route('/manufacturing-orders/<int:mo_id>')
 @login_required
 def mo_detail(mo_id):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute("""
-        SELECT mo.*, p.name AS product_name, b.name AS bom_name, u.name AS assignee_name
-        FROM manufacturing_orders mo
-        JOIN products p ON mo.product_id = p.id
-        LEFT JOIN boms b ON mo.bom_id = b.id
-        LEFT JOIN users u ON mo.assignee_id = u.id
-        WHERE mo.id = %s
-    """, (mo_id,))
-    order = cursor.fetchone()
-    cursor.execute("""
-        SELECT p.name AS component_name, p.on_hand_quantity, (bc.quantity_required * mo.quantity_to_produce) AS to_consume
-        FROM manufacturing_orders mo
-        JOIN bom_components bc ON mo.bom_id = bc.bom_id
-        JOIN products p ON bc.component_product_id = p.id
-        WHERE mo.id = %s
-    """, (mo_id,))
-    components = cursor.fetchall()
-    for comp in components:
-        comp['availability_status'] = 'Available' if comp['on_hand_quantity'] >= comp['to_consume'] else 'Not Available'
-    cursor.execute("""
-        SELECT wo.*, wc.name AS work_center_name
-        FROM work_orders wo
-        JOIN work_centers wc ON wo.work_center_id = wc.id
-        WHERE wo.mo_id = %s
-    """, (mo_id,))
+    order, sql = fetch_mo_header(cursor, mo_id)
+    cursor.execute(sql(MO_COMPONENTS_SQL), (mo_id,))
+    components = mark_component_availability(cursor.fetchall())
+    cursor.execute(sql(MO_WORK_ORDERS_SQL), (mo_id,))
     work_orders = cursor.fetchall()
     all_wos_done = all(wo['status'] == 'Done' for wo in work_orders) if work_orders else False
     if all_wos_done and order['status'] == 'In Progress':
         cursor.execute("UPDATE manufacturing_orders SET status = 'To Close' WHERE id = %s", (mo_id,))
         log_mo_status_change(cursor, mo_id, 'To Close')
         conn.commit()
+        bump_versions(conn, 'manufacturing_orders', 'manufacturing_order_status_history')
+        invalidate_mo_fragments(mo_id)
         order['status'] = 'To Close'
-    cursor.execute(
-        "SELECT status, timestamp FROM manufacturing_order_status_history WHERE mo_id = %s ORDER BY timestamp",
-        (mo_id,)
-    )
+    cursor.execute(sql(MO_HISTORY_SQL), (mo_id,))
     status_history = cursor.fetchall()
     cursor.close()
     conn.close()
     return render_template('mo_detail.html', order=order, components=components, work_orders=work_orders,status_history=status_history)
 
-@app.route('/manufacturing-orders/<int:mo_id>/confirm', methods=['POST'])
+@bp.route('/manufacturing-orders/<int:mo_id>/confirm', methods=['POST'])
 @login_required
+@admit('critical')
 def confirm_manufacturing_order(mo_id):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     cursor.execute("UPDATE manufacturing_orders SET status = 'Confirmed' WHERE id = %s", (mo_id,))
     log_mo_status_change(cursor, mo_id, 'Confirmed')
     conn.commit()
+    bump_versions(conn, 'manufacturing_orders', 'manufacturing_order_status_history')
+    invalidate_mo_fragments(mo_id)
     
-    # Get updated order data for JSON response
-    cursor.execute("""
-        SELECT mo.*, p.name AS product_name, b.name AS bom_name, u.name AS assignee_name
-        FROM manufacturing_orders mo
-        JOIN products p ON mo.product_id = p.id
-        LEFT JOIN boms b ON mo.bom_id = b.id
-        LEFT JOIN users u ON mo.assignee_id = u.id
-        WHERE mo.id = %s
-    """, (mo_id,))
-    order = cursor.fetchone()
-    
-    cursor.execute("""
-        SELECT p.name AS component_name, p.on_hand_quantity, (bc.quantity_required * mo.quantity_to_produce) AS to_consume
-        FROM manufacturing_orders mo
-        JOIN bom_components bc ON mo.bom_id = bc.bom_id
-        JOIN products p ON bc.component_product_id = p.id
-        WHERE mo.id = %s
-    """, (mo_id,))
-    components = cursor.fetchall()
-    for comp in components:
-        comp['availability_status'] = 'Available' if comp['on_hand_quantity'] >= comp['to_consume'] else 'Not Available'
-    
-    cursor.execute("""
-        SELECT wo.*, wc.name AS work_center_name
-        FROM work_orders wo
-        JOIN work_centers wc ON wo.work_center_id = wc.id
-        WHERE wo.mo_id = %s
-    """, (mo_id,))
-    work_orders = cursor.fetchall()
-    
-    cursor.execute(
-        "SELECT status, timestamp FROM manufacturing_order_status_history WHERE mo_id = %s ORDER BY timestamp",
-        (mo_id,)
-    )
-    status_history = cursor.fetchall()
-    
+    data = get_mo_data_for_json(cursor, mo_id)
     cursor.close()
     conn.close()
     
     # Check if this is an AJAX request by looking for X-Requested-With header
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        return jsonify({
-            'order': order,
-            'components': components,
-            'work_orders': work_orders,
-            'status_history': status_history
-        })
+        return jsonify(data)
     
-    return redirect(url_for('mo_detail', mo_id=mo_id))
+    return redirect(url_for('main.mo_detail', mo_id=mo_id))
 
-@app.route('/manufacturing-orders/<int:mo_id>/start', methods=['POST'])
+@bp.route('/manufacturing-orders/<int:mo_id>/start', methods=['POST'])
 @login_required
+@admit('critical')
 def start_manufacturing_order(mo_id):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
@@ -597,118 +678,44 @@ def start_manufacturing_order(mo_id):
     )
     log_mo_status_change(cursor, mo_id, 'In Progress')
     conn.commit()
+    bump_versions(conn, 'manufacturing_orders', 'manufacturing_order_status_history')
+    invalidate_mo_fragments(mo_id)
     
-    # Get updated order data for JSON response
-    cursor.execute("""
-        SELECT mo.*, p.name AS product_name, b.name AS bom_name, u.name AS assignee_name
-        FROM manufacturing_orders mo
-        JOIN products p ON mo.product_id = p.id
-        LEFT JOIN boms b ON mo.bom_id = b.id
-        LEFT JOIN users u ON mo.assignee_id = u.id
-        WHERE mo.id = %s
-    """, (mo_id,))
-    order = cursor.fetchone()
-    
-    cursor.execute("""
-        SELECT p.name AS component_name, p.on_hand_quantity, (bc.quantity_required * mo.quantity_to_produce) AS to_consume
-        FROM manufacturing_orders mo
-        JOIN bom_components bc ON mo.bom_id = bc.bom_id
-        JOIN products p ON bc.component_product_id = p.id
-        WHERE mo.id = %s
-    """, (mo_id,))
-    components = cursor.fetchall()
-    for comp in components:
-        comp['availability_status'] = 'Available' if comp['on_hand_quantity'] >= comp['to_consume'] else 'Not Available'
-    
-    cursor.execute("""
-        SELECT wo.*, wc.name AS work_center_name
-        FROM work_orders wo
-        JOIN work_centers wc ON wo.work_center_id = wc.id
-        WHERE wo.mo_id = %s
-    """, (mo_id,))
-    work_orders = cursor.fetchall()
-    
-    cursor.execute(
-        "SELECT status, timestamp FROM manufacturing_order_status_history WHERE mo_id = %s ORDER BY timestamp",
-        (mo_id,)
-    )
-    status_history = cursor.fetchall()
-    
+    data = get_mo_data_for_json(cursor, mo_id)
     cursor.close()
     conn.close()
     
     # Check if this is an AJAX request by looking for X-Requested-With header
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        return jsonify({
-            'order': order,
-            'components': components,
-            'work_orders': work_orders,
-            'status_history': status_history
-        })
+        return jsonify(data)
     
-    return redirect(url_for('mo_detail', mo_id=mo_id))
+    return redirect(url_for('main.mo_detail', mo_id=mo_id))
 
-@app.route('/manufacturing-orders/<int:mo_id>/cancel', methods=['POST'])
+@bp.route('/manufacturing-orders/<int:mo_id>/cancel', methods=['POST'])
 @login_required
+@admit('critical')
 def cancel_manufacturing_order(mo_id):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute("UPDATE manufacturing_orders SET status = 'Cancelled' WHERE id = %s", (mo_id,))
+    cursor.execute("UPDATE manufacturing_orders SET status = 'Cancelled', completed_at = %s WHERE id = %s", (datetime.now(), mo_id))
     log_mo_status_change(cursor, mo_id, 'Cancelled')
     conn.commit()
+    bump_versions(conn, 'manufacturing_orders', 'manufacturing_order_status_history')
+    invalidate_mo_fragments(mo_id)
     
-    # Get updated order data for JSON response
-    cursor.execute("""
-        SELECT mo.*, p.name AS product_name, b.name AS bom_name, u.name AS assignee_name
-        FROM manufacturing_orders mo
-        JOIN products p ON mo.product_id = p.id
-        LEFT JOIN boms b ON mo.bom_id = b.id
-        LEFT JOIN users u ON mo.assignee_id = u.id
-        WHERE mo.id = %s
-    """, (mo_id,))
-    order = cursor.fetchone()
-    
-    cursor.execute("""
-        SELECT p.name AS component_name, p.on_hand_quantity, (bc.quantity_required * mo.quantity_to_produce) AS to_consume
-        FROM manufacturing_orders mo
-        JOIN bom_components bc ON mo.bom_id = bc.bom_id
-        JOIN products p ON bc.component_product_id = p.id
-        WHERE mo.id = %s
-    """, (mo_id,))
-    components = cursor.fetchall()
-    for comp in components:
-        comp['availability_status'] = 'Available' if comp['on_hand_quantity'] >= comp['to_consume'] else 'Not Available'
-    
-    cursor.execute("""
-        SELECT wo.*, wc.name AS work_center_name
-        FROM work_orders wo
-        JOIN work_centers wc ON wo.work_center_id = wc.id
-        WHERE wo.mo_id = %s
-    """, (mo_id,))
-    work_orders = cursor.fetchall()
-    
-    cursor.execute(
-        "SELECT status, timestamp FROM manufacturing_order_status_history WHERE mo_id = %s ORDER BY timestamp",
-        (mo_id,)
-    )
-    status_history = cursor.fetchall()
-    
+    data = get_mo_data_for_json(cursor, mo_id)
     cursor.close()
     conn.close()
     
     # Check if this is an AJAX request by looking for X-Requested-With header
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        return jsonify({
-            'order': order,
-            'components': components,
-            'work_orders': work_orders,
-            'status_history': status_history
-        })
+        return jsonify(data)
     
-    return redirect(url_for('mo_detail', mo_id=mo_id))
+    return redirect(url_for('main.mo_detail', mo_id=mo_id))
 
-@app.route('/work-orders/<int:wo_id>/start-timer', methods=['POST'])
+@bp.route('/work-orders/<int:wo_id>/start-timer', methods=['POST'])
 @login_required
+@admit('critical')
 def start_work_order_timer(wo_id):
     mo_id = request.form['mo_id']
     conn = get_db_connection()
@@ -722,66 +729,32 @@ def start_work_order_timer(wo_id):
             (datetime.now(), mo_id)
         )
         log_mo_status_change(cursor, mo_id, 'In Progress')
+    read_models.refresh_work_order(cursor, wo_id)
     conn.commit()
+    bump_versions(conn, 'work_orders', 'manufacturing_orders', 'manufacturing_order_status_history')
+    invalidate_mo_fragments(mo_id)
+    fragment_cache.invalidate('wo_row', wo_id)
     
-    # Get updated order data for JSON response
-    cursor.execute("""
-        SELECT mo.*, p.name AS product_name, b.name AS bom_name, u.name AS assignee_name
-        FROM manufacturing_orders mo
-        JOIN products p ON mo.product_id = p.id
-        LEFT JOIN boms b ON mo.bom_id = b.id
-        LEFT JOIN users u ON mo.assignee_id = u.id
-        WHERE mo.id = %s
-    """, (mo_id,))
-    order = cursor.fetchone()
-    
-    cursor.execute("""
-        SELECT p.name AS component_name, p.on_hand_quantity, (bc.quantity_required * mo.quantity_to_produce) AS to_consume
-        FROM manufacturing_orders mo
-        JOIN bom_components bc ON mo.bom_id = bc.bom_id
-        JOIN products p ON bc.component_product_id = p.id
-        WHERE mo.id = %s
-    """, (mo_id,))
-    components = cursor.fetchall()
-    for comp in components:
-        comp['availability_status'] = 'Available' if comp['on_hand_quantity'] >= comp['to_consume'] else 'Not Available'
-    
-    cursor.execute("""
-        SELECT wo.*, wc.name AS work_center_name
-        FROM work_orders wo
-        JOIN work_centers wc ON wo.work_center_id = wc.id
-        WHERE wo.mo_id = %s
-    """, (mo_id,))
-    work_orders = cursor.fetchall()
-    
-    cursor.execute(
-        "SELECT status, timestamp FROM manufacturing_order_status_history WHERE mo_id = %s ORDER BY timestamp",
-        (mo_id,)
-    )
-    status_history = cursor.fetchall()
-    
+    data = get_mo_data_for_json(cursor, mo_id)
     cursor.close()
     conn.close()
     
     # Check if this is an AJAX request by looking for X-Requested-With header
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        return jsonify({
-            'order': order,
-            'components': components,
-            'work_orders': work_orders,
-            'status_history': status_history
-        })
+        return jsonify(data)
     
-    return redirect(url_for('mo_detail', mo_id=mo_id))
+    return redirect(url_for('main.mo_detail', mo_id=mo_id))
 
-@app.route('/work-orders/<int:wo_id>/done', methods=['POST'])
+@bp.route('/work-orders/<int:wo_id>/done', methods=['POST'])
 @login_required
+@admit('critical')
 def complete_work_order(wo_id):
     mo_id = request.form['mo_id']
     end_time = datetime.now()
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT start_time FROM work_orders WHERE id = %s", (wo_id,))
+    # Locked so two concurrent "done" submits can't both count as the first completion.
+    cursor.execute("SELECT start_time, status, bom_operation_id, work_center_id FROM work_orders WHERE id = %s FOR UPDATE", (wo_id,))
     work_order = cursor.fetchone()
     start_time = work_order['start_time']
     real_duration = 0
@@ -792,6 +765,11 @@ def complete_work_order(wo_id):
         "UPDATE work_orders SET end_time = %s, real_duration_minutes = %s, status = 'Done' WHERE id = %s",
         (end_time, real_duration, wo_id)
     )
+    # Only timed work orders completed for the first time teach the estimates.
+    changed = ['work_orders', 'manufacturing_orders', 'manufacturing_order_status_history']
+    if start_time and work_order['status'] != 'Done' and work_order['bom_operation_id'] is not None:
+        duration_stats.record_completion(cursor, work_order['bom_operation_id'], work_order['work_center_id'], real_duration)
+        changed.append('operation_duration_stats')
     
     # Check if all work orders are done and update MO status
     cursor.execute("SELECT status FROM work_orders WHERE mo_id = %s", (mo_id,))
@@ -804,192 +782,121 @@ def complete_work_order(wo_id):
         if current_mo_status == 'In Progress':
             cursor.execute("UPDATE manufacturing_orders SET status = 'To Close' WHERE id = %s", (mo_id,))
             log_mo_status_change(cursor, mo_id, 'To Close')
+    read_models.refresh_work_order(cursor, wo_id)
     
     conn.commit()
+    bump_versions(conn, *changed)
+    invalidate_mo_fragments(mo_id)
+    fragment_cache.invalidate('wo_row', wo_id)
     
-    # Get updated order data for JSON response
-    cursor.execute("""
-        SELECT mo.*, p.name AS product_name, b.name AS bom_name, u.name AS assignee_name
-        FROM manufacturing_orders mo
-        JOIN products p ON mo.product_id = p.id
-        LEFT JOIN boms b ON mo.bom_id = b.id
-        LEFT JOIN users u ON mo.assignee_id = u.id
-        WHERE mo.id = %s
-    """, (mo_id,))
-    order = cursor.fetchone()
-    
-    cursor.execute("""
-        SELECT p.name AS component_name, p.on_hand_quantity, (bc.quantity_required * mo.quantity_to_produce) AS to_consume
-        FROM manufacturing_orders mo
-        JOIN bom_components bc ON mo.bom_id = bc.bom_id
-        JOIN products p ON bc.component_product_id = p.id
-        WHERE mo.id = %s
-    """, (mo_id,))
-    components = cursor.fetchall()
-    for comp in components:
-        comp['availability_status'] = 'Available' if comp['on_hand_quantity'] >= comp['to_consume'] else 'Not Available'
-    
-    cursor.execute("""
-        SELECT wo.*, wc.name AS work_center_name
-        FROM work_orders wo
-        JOIN work_centers wc ON wo.work_center_id = wc.id
-        WHERE wo.mo_id = %s
-    """, (mo_id,))
-    work_orders = cursor.fetchall()
-    
-    cursor.execute(
-        "SELECT status, timestamp FROM manufacturing_order_status_history WHERE mo_id = %s ORDER BY timestamp",
-        (mo_id,)
-    )
-    status_history = cursor.fetchall()
-    
+    data = get_mo_data_for_json(cursor, mo_id)
     cursor.close()
     conn.close()
     
     # Check if this is an AJAX request by looking for X-Requested-With header
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        return jsonify({
-            'order': order,
-            'components': components,
-            'work_orders': work_orders,
-            'status_history': status_history
-        })
+        return jsonify(data)
     
-    return redirect(url_for('mo_detail', mo_id=mo_id))
+    return redirect(url_for('main.mo_detail', mo_id=mo_id))
     
-@app.route('/work-orders')
+@bp.route('/work-orders')
 @login_required
+@conditional('work_orders', 'work_centers', 'manufacturing_orders', 'products')
 def list_work_orders():
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     cursor = conn.cursor(dictionary=True)
     search_query = request.args.get('search', '')
-    base_query = """
-        SELECT 
-            wo.id, wo.operation_name, wo.duration_minutes, wo.real_duration_minutes,
-            wo.status, wc.name as work_center_name, p.name as finished_product_name,
-            mo.id as mo_id, wo.start_time, wo.end_time
-        FROM work_orders wo
-        JOIN work_centers wc ON wo.work_center_id = wc.id
-        JOIN manufacturing_orders mo ON wo.mo_id = mo.id
-        JOIN products p ON mo.product_id = p.id
-    """
-    params = []
-    if search_query:
-        base_query += " WHERE (wo.operation_name LIKE %s OR wc.name LIKE %s OR p.name LIKE %s OR wo.status LIKE %s)"
-        search_term = f"%{search_query}%"
-        params.extend([search_term, search_term, search_term, search_term])
-    base_query += " ORDER BY wo.id DESC"
-    cursor.execute(base_query, tuple(params))
-    work_orders = cursor.fetchall()
+    work_center_id = request.args.get('work_center', type=int)
+    status_filter = request.args.get('status', '')
+    page = max(request.args.get('page', 1, type=int), 1)
+    # Reads the flat work_order_list projection (see read_models.py) instead of
+    # joining work_orders, work_centers, manufacturing_orders and products.
+    work_orders, has_next = read_models.list_work_orders(
+        cursor, search_query=search_query, work_center_id=work_center_id,
+        status=status_filter, page=page, per_page=WORK_ORDERS_PER_PAGE
+    )
+    cursor.execute('SELECT id, name FROM work_centers ORDER BY name')
+    work_centers = cursor.fetchall()
     cursor.close()
     conn.close()
-    return render_template('work_orders_list.html', work_orders=work_orders, search_query=search_query)
+    return render_template('work_orders_list.html', work_orders=work_orders, search_query=search_query,
+                           work_centers=work_centers, work_center_id=work_center_id, status_filter=status_filter,
+                           statuses=WORK_ORDER_STATUSES, page=page, has_next=has_next)
 
-@app.route('/manufacturing-orders/<int:mo_id>/produce', methods=['POST'])
+@bp.route('/manufacturing-orders/<int:mo_id>/produce', methods=['POST'])
 @login_required
+@admit('critical')
 def produce_manufacturing_order(mo_id):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT status FROM manufacturing_orders WHERE id = %s", (mo_id,))
+    # Locking the order keeps a double-submitted produce from consuming twice.
+    cursor.execute("SELECT status FROM manufacturing_orders WHERE id = %s FOR UPDATE", (mo_id,))
     current_status = cursor.fetchone()['status']
     if current_status != 'To Close':
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return jsonify({'error': 'Order is not ready to be produced'}), 400
-        return redirect(url_for('mo_detail', mo_id=mo_id))
+        return redirect(url_for('main.mo_detail', mo_id=mo_id))
     
     cursor.execute("SELECT product_id, quantity_to_produce, bom_id FROM manufacturing_orders WHERE id = %s", (mo_id,))
     mo = cursor.fetchone()
+    # Lock the components (in id order, like the reorder batch) so a reorder
+    # committed meanwhile is part of the level we read and decrement.
     cursor.execute("""
         SELECT p.id, p.name, p.on_hand_quantity, p.min_stock_level, p.reorder_quantity, bc.quantity_required 
         FROM bom_components bc
         JOIN products p ON bc.component_product_id = p.id
         WHERE bc.bom_id = %s
+        ORDER BY p.id
+        FOR UPDATE
     """, (mo['bom_id'],))
     components = cursor.fetchall()
+    stock_levels = {comp['id']: comp['on_hand_quantity'] for comp in components}
+    low_stock = []
     for comp in components:
         consumed_qty = comp['quantity_required'] * mo['quantity_to_produce']
-        new_stock_level = comp['on_hand_quantity'] - consumed_qty
-        cursor.execute("UPDATE products SET on_hand_quantity = %s WHERE id = %s", (new_stock_level, comp['id']))
+        cursor.execute("UPDATE products SET on_hand_quantity = on_hand_quantity - %s WHERE id = %s", (consumed_qty, comp['id']))
         cursor.execute("INSERT INTO stock_ledger (product_id, quantity_change, reason, mo_id) VALUES (%s, %s, %s, %s)", (comp['id'], -consumed_qty, 'MO Consumption', mo_id))
-        if new_stock_level < comp['min_stock_level']:
-            reorder_amount = comp['reorder_quantity']
-            flash(f"LOW STOCK ALERT: {comp['name']} fell to {new_stock_level}. Automatically reordering {reorder_amount} units.", 'warning')
-            cursor.execute("UPDATE products SET on_hand_quantity = on_hand_quantity + %s WHERE id = %s", (reorder_amount, comp['id']))
-            cursor.execute("INSERT INTO stock_ledger (product_id, quantity_change, reason, mo_id) VALUES (%s, %s, %s, %s)", (comp['id'], reorder_amount, 'Automatic Reorder', mo_id))
+        stock_levels[comp['id']] -= consumed_qty
+        new_stock_level = stock_levels[comp['id']]
+        if new_stock_level < comp['min_stock_level'] and comp['id'] not in low_stock:
+            low_stock.append(comp['id'])
+            flash(f"LOW STOCK ALERT: {comp['name']} fell to {new_stock_level}. Reorder of {comp['reorder_quantity']} units queued.", 'warning')
     produced_qty = mo['quantity_to_produce']
     cursor.execute("UPDATE products SET on_hand_quantity = on_hand_quantity + %s WHERE id = %s", (produced_qty, mo['product_id']))
     cursor.execute("INSERT INTO stock_ledger (product_id, quantity_change, reason, mo_id) VALUES (%s, %s, %s, %s)", (mo['product_id'], produced_qty, 'MO Production', mo_id))
     cursor.execute("UPDATE manufacturing_orders SET status = 'Done', completed_at = %s WHERE id = %s", (datetime.now(), mo_id))
     log_mo_status_change(cursor, mo_id, 'Done')
     conn.commit()
+    # Reorders run after the commit on the background queue (jobs.py).
+    for product_id in low_stock:
+        reorder_queue.enqueue(product_id, mo_id)
+    bump_versions(conn, 'products', 'stock_ledger', 'manufacturing_orders', 'manufacturing_order_status_history')
+    invalidate_mo_fragments(mo_id)
     
-    # Get updated order data for JSON response
-    cursor.execute("""
-        SELECT mo.*, p.name AS product_name, b.name AS bom_name, u.name AS assignee_name
-        FROM manufacturing_orders mo
-        JOIN products p ON mo.product_id = p.id
-        LEFT JOIN boms b ON mo.bom_id = b.id
-        LEFT JOIN users u ON mo.assignee_id = u.id
-        WHERE mo.id = %s
-    """, (mo_id,))
-    order = cursor.fetchone()
-    
-    cursor.execute("""
-        SELECT p.name AS component_name, p.on_hand_quantity, (bc.quantity_required * mo.quantity_to_produce) AS to_consume
-        FROM manufacturing_orders mo
-        JOIN bom_components bc ON mo.bom_id = bc.bom_id
-        JOIN products p ON bc.component_product_id = p.id
-        WHERE mo.id = %s
-    """, (mo_id,))
-    components = cursor.fetchall()
-    for comp in components:
-        comp['availability_status'] = 'Available' if comp['on_hand_quantity'] >= comp['to_consume'] else 'Not Available'
-    
-    cursor.execute("""
-        SELECT wo.*, wc.name AS work_center_name
-        FROM work_orders wo
-        JOIN work_centers wc ON wo.work_center_id = wc.id
-        WHERE wo.mo_id = %s
-    """, (mo_id,))
-    work_orders = cursor.fetchall()
-    
-    cursor.execute(
-        "SELECT status, timestamp FROM manufacturing_order_status_history WHERE mo_id = %s ORDER BY timestamp",
-        (mo_id,)
-    )
-    status_history = cursor.fetchall()
-    
+    data = get_mo_data_for_json(cursor, mo_id)
     cursor.close()
     conn.close()
     
     # Check if this is an AJAX request by looking for X-Requested-With header
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        return jsonify({
-            'order': order,
-            'components': components,
-            'work_orders': work_orders,
-            'status_history': status_history
-        })
+        return jsonify(data)
     
-    return redirect(url_for('mo_detail', mo_id=mo_id))
+    return redirect(url_for('main.mo_detail', mo_id=mo_id))
 
-@app.route('/stock-ledger')
+@bp.route('/stock-ledger')
 @login_required
+@conditional('stock_ledger', 'products')
+@admit('heavy')
 def stock_ledger():
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     cursor = conn.cursor(dictionary=True)
-    cursor.execute("""
-        SELECT s.timestamp, s.quantity_change, s.reason, p.name as product_name
-        FROM stock_ledger s
-        JOIN products p ON s.product_id = p.id
-        ORDER BY s.timestamp DESC
-    """)
+    cursor.execute(build_stock_ledger_query(include_archive()))
     ledger_entries = cursor.fetchall()
     cursor.close()
     conn.close()
-    return render_template('stock_ledger.html', entries=ledger_entries)
+    return render_template('stock_ledger.html', entries=ledger_entries, include_archive=include_archive())
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         email = request.form['email']
@@ -1000,21 +907,45 @@ def login():
         user_data = cursor.fetchone()
         cursor.close()
         conn.close()
-        if user_data and bcrypt.check_password_hash(user_data['password_hash'], password):
-            user = User(id=user_data['id'], name=user_data['name'], email=user_data['email'])
+        try:
+            password_ok = user_data is not None and password_hasher.check(user_data['password_hash'], password)
+        except HashingBusy:
+            return 'Server is busy, please try again in a moment.', 503, {'Retry-After': '2'}
+        if password_ok and password_hasher.needs_rehash(user_data['password_hash']):
+            # BCRYPT_LOG_ROUNDS changed since this hash was made; upgrade it now
+            # while we still have the plain-text password. Optional: when the
+            # pool is busy the login goes ahead and a later one upgrades it.
+            try:
+                new_hash = password_hasher.generate(password)
+            except HashingBusy:
+                metrics.incr('password_hashing.rehash_skipped')
+                new_hash = None
+            if new_hash is not None:
+                conn = get_db_connection()
+                cursor = conn.cursor()
+                cursor.execute("UPDATE users SET password_hash = %s WHERE id = %s", (new_hash, user_data['id']))
+                conn.commit()
+                cursor.close()
+                conn.close()
+        if password_ok:
+            user = User(id=user_data['id'], name=user_data['name'], email=user_data['email'], role=user_data['role'])
             login_user(user)
-            return redirect(url_for('list_manufacturing_orders'))
+            user_cache.store(user_data)
+            return redirect(url_for('main.list_manufacturing_orders'))
         else:
             return 'Invalid username or password'
     return render_template('login.html')
 
-@app.route('/signup', methods=['GET', 'POST'])
+@bp.route('/signup', methods=['GET', 'POST'])
 def signup():
     if request.method == 'POST':
         name = request.form['name']
         email = request.form['email']
         password = request.form['password']
-        hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+        try:
+            hashed_password = password_hasher.generate(password)
+        except HashingBusy:
+            return 'Server is busy, please try again in a moment.', 503, {'Retry-After': '2'}
         conn = get_db_connection()
         cursor = conn.cursor()
         try:
@@ -1028,14 +959,24 @@ def signup():
         finally:
             cursor.close()
             conn.close()
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     return render_template('signup.html')
 
-@app.route('/logout')
+@bp.route('/logout')
 @login_required
 def logout():
+    user_cache.revoke(current_user.id)
     logout_user()
-    return redirect(url_for('login'))
+    user_cache.clear_session()
+    return redirect(url_for('main.login'))
+
+@bp.route('/api/metrics')
+@login_required
+def api_metrics():
+    snapshot = metrics.snapshot()
+    snapshot['user_cache'] = user_cache.stats()
+    snapshot['admission'] = admission.stats()
+    return jsonify(snapshot)
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file
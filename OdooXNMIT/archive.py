@@ -0,0 +1,110 @@
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+import metrics
+from db import get_db_connection
+from http_cache import bump_versions
+
+# --- Hot / cold archival ---
+# Done and Cancelled orders finished before the cutoff move, together with
+# their work orders and status history, to the *_archive tables
+# (migrations/0003); so do stock-ledger rows older than the cutoff. Each
+# batch is one transaction that copies and then deletes, so the job can be
+# stopped at any point and simply picks up where it left off on the next run.
+# Orders are archived whole or not at all.
+
+def _in_clause(ids):
+    return ', '.join(['%s'] * len(ids))
+
+def archive_orders_batch(conn, cutoff, batch_size):
+    """Move up to `batch_size` finished orders older than `cutoff`. Returns how many moved."""
+    cursor = conn.cursor()
+    # Orders cancelled before completed_at was recorded fall back to their schedule date.
+    cursor.execute("""
+        SELECT id FROM manufacturing_orders
+        WHERE status IN ('Done', 'Cancelled') AND COALESCE(completed_at, schedule_start_date) < %s
+        ORDER BY id LIMIT %s FOR UPDATE
+    """, (cutoff, batch_size))
+    ids = tuple(row[0] for row in cursor.fetchall())
+    if not ids:
+        conn.rollback()
+        cursor.close()
+        return 0
+    placeholders = _in_clause(ids)
+    for table in ('work_orders', 'manufacturing_order_status_history'):
+        cursor.execute(f"INSERT IGNORE INTO {table}_archive SELECT * FROM {table} WHERE mo_id IN ({placeholders})", ids)
+    cursor.execute(f"INSERT IGNORE INTO manufacturing_orders_archive SELECT * FROM manufacturing_orders WHERE id IN ({placeholders})", ids)
+    cursor.execute(f"DELETE FROM work_order_list WHERE mo_id IN ({placeholders})", ids)
+    for table in ('work_orders', 'manufacturing_order_status_history'):
+        cursor.execute(f"DELETE FROM {table} WHERE mo_id IN ({placeholders})", ids)
+    cursor.execute(f"DELETE FROM manufacturing_orders WHERE id IN ({placeholders})", ids)
+    conn.commit()
+    cursor.close()
+    bump_versions(conn, 'manufacturing_orders', 'work_orders', 'manufacturing_order_status_history')
+    return len(ids)
+
+def archive_ledger_batch(conn, cutoff, batch_size):
+    """Move up to `batch_size` stock-ledger rows older than `cutoff`. Returns how many moved."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id FROM stock_ledger WHERE timestamp < %s
+        ORDER BY timestamp, id LIMIT %s FOR UPDATE
+    """, (cutoff, batch_size))
+    ids = tuple(row[0] for row in cursor.fetchall())
+    if not ids:
+        conn.rollback()
+        cursor.close()
+        return 0
+    placeholders = _in_clause(ids)
+    cursor.execute(f"INSERT IGNORE INTO stock_ledger_archive SELECT * FROM stock_ledger WHERE id IN ({placeholders})", ids)
+    cursor.execute(f"DELETE FROM stock_ledger WHERE id IN ({placeholders})", ids)
+    conn.commit()
+    cursor.close()
+    bump_versions(conn, 'stock_ledger')
+    return len(ids)
+
+def run(conn, cutoff, batch_size, max_batches=None, pause=0.0, echo=None):
+    """Archive in batches until nothing older than `cutoff` is left (or `max_batches` per kind)."""
+    totals = {}
+    for kind, archive_batch in (('orders', archive_orders_batch), ('ledger', archive_ledger_batch)):
+        totals[kind] = batches = 0
+        while max_batches is None or batches < max_batches:
+            moved = archive_batch(conn, cutoff, batch_size)
+            if not moved:
+                break
+            batches += 1
+            totals[kind] += moved
+            metrics.incr(f'archive.{kind}', moved)
+            if echo:
+                echo(f"  {kind}: moved {moved} (total {totals[kind]})")
+            # Gives concurrent writers (and replicas) room between batches.
+            if pause:
+                time.sleep(pause)
+    return totals
+
+@click.command('archive')
+@click.option('--days', type=int, default=None, help='Archive what finished more than this many days ago (ARCHIVE_AFTER_DAYS).')
+@click.option('--batch-size', type=int, default=None, help='Rows per transaction (ARCHIVE_BATCH_SIZE).')
+@click.option('--max-batches', type=int, default=None, help='Stop after this many batches of each kind.')
+@click.option('--pause', type=float, default=0.0, help='Seconds to sleep between batches.')
+@with_appcontext
+def archive_command(days, batch_size, max_batches, pause):
+    """Move finished orders and old ledger rows to the archive tables."""
+    config = current_app.config
+    days = config.get('ARCHIVE_AFTER_DAYS', 90) if days is None else days
+    batch_size = batch_size or config.get('ARCHIVE_BATCH_SIZE', 500)
+    cutoff = datetime.now() - timedelta(days=days)
+    click.echo(f"Archiving orders finished and ledger rows recorded before {cutoff:%Y-%m-%d %H:%M}.")
+    conn = get_db_connection()
+    try:
+        totals = run(conn, cutoff, batch_size, max_batches, pause, echo=click.echo)
+    finally:
+        conn.close()
+    click.echo(f"Archived {totals['orders']} orders and {totals['ledger']} ledger rows.")
+
+def init_app(app):
+    app.cli.add_command(archive_command)
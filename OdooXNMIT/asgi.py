@@ -0,0 +1,13 @@
+"""ASGI entry point: the async JSON API plus the Flask app behind it.
+
+    uvicorn asgi:application --workers 4
+"""
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from app import create_app
+from async_api import create_async_app
+
+flask_app = create_app(os.getenv('APP_CONFIG', 'production'))
+application = create_async_app(flask_app, fallback=WSGIMiddleware(flask_app))
@@ -0,0 +1,186 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import aiomysql
+from itsdangerous import BadSignature
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+
+from http_cache import bump_versions_sql
+from json_provider import columnar
+from queries import (MO_HEADER_SQL, MO_COMPONENTS_SQL, MO_WORK_ORDERS_SQL, MO_HISTORY_SQL,
+                     LOG_MO_STATUS_SQL, mark_component_availability, build_mo_list_query, archived)
+
+# --- Async JSON API ---
+# Async twins of the dashboard JSON endpoints, served under /api/async by
+# asgi.py next to the Flask app. Each request borrows connections from an
+# aiomysql pool, and queries that don't depend on each other (the four parts
+# of an MO snapshot, orders vs. stock levels) run concurrently instead of one
+# after another on a blocked worker thread.
+#
+# Authentication reuses the Flask session cookie, so a browser that is logged
+# in to the HTML app can call these endpoints as-is.
+
+def create_async_app(flask_app, fallback=None):
+    """Starlette app serving /api/async/*; `fallback` (e.g. the wrapped Flask app) gets everything else."""
+    config = flask_app.config
+    state = {}
+
+    @asynccontextmanager
+    async def lifespan(app):
+        state['pool'] = await aiomysql.create_pool(
+            host=config['DB_HOST'],
+            port=int(config.get('DB_PORT') or 3306),
+            user=config['DB_USER'],
+            password=config['DB_PASSWORD'],
+            db=config['DB_NAME'],
+            minsize=1,
+            maxsize=config.get('ASYNC_DB_POOL_SIZE', 10),
+            # Reads run outside transactions: aiomysql's pool closes a
+            # connection released mid-transaction, and an open REPEATABLE READ
+            # snapshot would go stale. transition() begins its own.
+            autocommit=True,
+        )
+        try:
+            yield
+        finally:
+            state['pool'].close()
+            await state['pool'].wait_closed()
+
+    def json_response(data, status_code=200):
+        # Same encoder as the Flask routes, so both tiers return identical bodies.
+        return Response(flask_app.json.dumps(data), status_code=status_code, media_type='application/json')
+
+    def session_user_id(request):
+        cookie = request.cookies.get(config['SESSION_COOKIE_NAME'])
+        if not cookie:
+            return None
+        serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+        try:
+            data = serializer.loads(cookie, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+        except BadSignature:
+            return None
+        return data.get('_user_id')
+
+    async def fetchall(sql, params=()):
+        async with state['pool'].acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(sql, params)
+                return await cursor.fetchall()
+
+    async def fetchone(sql, params=()):
+        rows = await fetchall(sql, params)
+        return rows[0] if rows else None
+
+    async def mo_snapshot(mo_id, sql=lambda query: query):
+        order, components, work_orders, status_history = await asyncio.gather(
+            fetchone(sql(MO_HEADER_SQL), (mo_id,)),
+            fetchall(sql(MO_COMPONENTS_SQL), (mo_id,)),
+            fetchall(sql(MO_WORK_ORDERS_SQL), (mo_id,)),
+            fetchall(sql(MO_HISTORY_SQL), (mo_id,)),
+        )
+        if order is None and sql is not archived:
+            # Not a live order; it may have been moved out by `flask archive`.
+            snapshot = await mo_snapshot(mo_id, archived)
+            if snapshot['order'] is not None:
+                snapshot['order']['archived'] = True
+            return snapshot
+        return {
+            'order': order,
+            'components': mark_component_availability(list(components)),
+            'work_orders': work_orders,
+            'status_history': status_history
+        }
+
+    async def list_manufacturing_orders(request):
+        user_id = session_user_id(request)
+        if user_id is None:
+            return json_response({'error': 'Login required'}, 401)
+        base_query, params = build_mo_list_query(
+            request.query_params.get('filter', 'All'),
+            request.query_params.get('search', ''),
+            request.query_params.get('owner', 'all'),
+            user_id,
+            request.query_params.get('archive') == '1',
+        )
+        orders, stock_rows = await asyncio.gather(
+            fetchall(base_query, params),
+            fetchall("SELECT id, on_hand_quantity FROM products"),
+        )
+        orders = list(orders)
+        product_stock = {row['id']: row['on_hand_quantity'] for row in stock_rows}
+        # One query for the components of every BOM on the page instead of one per order.
+        bom_ids = sorted({order['bom_id'] for order in orders if order['bom_id'] is not None})
+        components_by_bom = {}
+        if bom_ids:
+            placeholders = ', '.join(['%s'] * len(bom_ids))
+            rows = await fetchall(
+                f"SELECT bc.bom_id, bc.component_product_id, bc.quantity_required FROM bom_components bc WHERE bc.bom_id IN ({placeholders})",
+                tuple(bom_ids),
+            )
+            for row in rows:
+                components_by_bom.setdefault(row['bom_id'], []).append(row)
+        for order in orders:
+            components = components_by_bom.get(order['bom_id'])
+            if not components:
+                order['component_status'] = 'N/A'
+                continue
+            order['component_status'] = 'Available'
+            for comp in components:
+                required = comp['quantity_required'] * order['quantity_to_produce']
+                if product_stock.get(comp['component_product_id'], 0) < required:
+                    order['component_status'] = 'Not Available'
+                    break
+        if request.query_params.get('format') == 'columnar':
+            return json_response(columnar(orders))
+        return json_response(orders)
+
+    async def manufacturing_order(request):
+        if session_user_id(request) is None:
+            return json_response({'error': 'Login required'}, 401)
+        return json_response(await mo_snapshot(request.path_params['mo_id']))
+
+    def transition(statements, status):
+        # `statements` is a list of (sql, params_fn) run in one transaction,
+        # followed by the status-history row, mirroring the Flask routes.
+        async def endpoint(request):
+            if session_user_id(request) is None:
+                return json_response({'error': 'Login required'}, 401)
+            mo_id = request.path_params['mo_id']
+            async with state['pool'].acquire() as conn:
+                await conn.begin()
+                try:
+                    async with conn.cursor() as cursor:
+                        for sql, params_fn in statements:
+                            await cursor.execute(sql, params_fn(mo_id))
+                        await cursor.execute(LOG_MO_STATUS_SQL, (mo_id, status, datetime.now()))
+                    await conn.commit()
+                except BaseException:
+                    await conn.rollback()
+                    raise
+                # Autocommitted on its own, after the change, as bump_versions does.
+                async with conn.cursor() as cursor:
+                    await cursor.execute(*bump_versions_sql(('manufacturing_orders', 'manufacturing_order_status_history')))
+            return json_response(await mo_snapshot(mo_id))
+        return endpoint
+
+    routes = [
+        Route('/api/async/manufacturing-orders', list_manufacturing_orders),
+        Route('/api/async/manufacturing-orders/{mo_id:int}', manufacturing_order),
+        Route('/api/async/manufacturing-orders/{mo_id:int}/confirm', transition(
+            [("UPDATE manufacturing_orders SET status = 'Confirmed' WHERE id = %s", lambda mo_id: (mo_id,))],
+            'Confirmed'), methods=['POST']),
+        Route('/api/async/manufacturing-orders/{mo_id:int}/start', transition(
+            [("UPDATE manufacturing_orders SET status = 'In Progress', start_time = %s WHERE id = %s AND start_time IS NULL",
+              lambda mo_id: (datetime.now(), mo_id))],
+            'In Progress'), methods=['POST']),
+        Route('/api/async/manufacturing-orders/{mo_id:int}/cancel', transition(
+            [("UPDATE manufacturing_orders SET status = 'Cancelled', completed_at = %s WHERE id = %s",
+              lambda mo_id: (datetime.now(), mo_id))],
+            'Cancelled'), methods=['POST']),
+    ]
+    if fallback is not None:
+        routes.append(Mount('/', app=fallback))
+    return Starlette(routes=routes, lifespan=lifespan)
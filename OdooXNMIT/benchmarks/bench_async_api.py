@@ -0,0 +1,63 @@
+"""Concurrent-client throughput of the sync vs. async JSON API.
+
+Needs a running server that serves both tiers (uvicorn asgi:application) and
+a session cookie copied from a logged-in browser:
+
+    uvicorn asgi:application --port 8000 --workers 1 &
+    python benchmarks/bench_async_api.py --cookie "session=..." --mo-id 1 --clients 1 8 32 64
+
+For every client count it reports requests/sec and p95 latency for the order
+list and the single-order snapshot on /api/... (Flask) and /api/async/...
+Pass --sync-base-url to measure the Flask side on gunicorn instead.
+"""
+import argparse
+import threading
+import time
+import urllib.request
+
+PAIRS = [
+    ('list', '/api/manufacturing-orders', '/api/async/manufacturing-orders'),
+    ('snapshot', '/api/manufacturing-orders/{mo_id}', '/api/async/manufacturing-orders/{mo_id}'),
+]
+
+def load(url, cookie, clients, seconds):
+    latencies = [[] for _ in range(clients)]
+    stop_at = time.time() + seconds
+
+    def client(i):
+        request = urllib.request.Request(url, headers={'Cookie': cookie})
+        while time.time() < stop_at:
+            started = time.perf_counter()
+            with urllib.request.urlopen(request, timeout=30) as resp:
+                resp.read()
+            latencies[i].append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    samples = sorted(x for per_client in latencies for x in per_client)
+    p95 = samples[int(len(samples) * 0.95) - 1] * 1000 if samples else 0.0
+    return len(samples) / seconds, p95
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--sync-base-url', help='defaults to --base-url')
+    parser.add_argument('--cookie', required=True)
+    parser.add_argument('--mo-id', type=int, default=1)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32, 64])
+    parser.add_argument('--seconds', type=int, default=10)
+    args = parser.parse_args()
+
+    sync_base_url = args.sync_base_url or args.base_url
+    print(f"{'endpoint':>9} {'clients':>8} {'sync req/s':>11} {'sync p95ms':>11} {'async req/s':>12} {'async p95ms':>12}")
+    for name, sync_path, async_path in PAIRS:
+        for clients in args.clients:
+            sync_rps, sync_p95 = load(sync_base_url + sync_path.format(mo_id=args.mo_id), args.cookie, clients, args.seconds)
+            async_rps, async_p95 = load(args.base_url + async_path.format(mo_id=args.mo_id), args.cookie, clients, args.seconds)
+            print(f"{name:>9} {clients:>8} {sync_rps:>11.1f} {sync_p95:>11.1f} {async_rps:>12.1f} {async_p95:>12.1f}")
+
+if __name__ == '__main__':
+    main()
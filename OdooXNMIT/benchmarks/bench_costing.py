@@ -0,0 +1,86 @@
+"""BOM cost roll-up over a synthetic graph of thousands of BOMs.
+
+Times loading the graph into CostEngine, the first (cold) roll-up of every
+BOM, a warm pass served from the memo, and recomputation after a component
+price change. No database is needed; the engine is fed synthetic rows:
+
+    python benchmarks/bench_costing.py --boms 5000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from costing import CostEngine
+
+class SyntheticCursor:
+    """Answers CostEngine._load's five queries from in-memory rows."""
+    def __init__(self, tables):
+        self.tables = tables
+        self.rows = []
+
+    def execute(self, sql, params=()):
+        self.rows = next(rows for marker, rows in self.tables.items() if marker in sql)
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+def make_graph(n_boms, n_raw, seed):
+    rng = random.Random(seed)
+    boms = [(i, f"BOM {i}", n_raw + i) for i in range(n_boms)]
+    products = [(p, f"Raw {p}", Decimal(rng.randint(10, 500)) / 100) for p in range(n_raw)]
+    products += [(n_raw + i, f"Assembly {i}", Decimal(0)) for i in range(n_boms)]
+    components = []
+    for i in range(n_boms):
+        for _ in range(6):
+            # Earlier BOMs' products as sub-assemblies keep the graph acyclic.
+            product = n_raw + rng.randrange(i) if i and rng.random() < 0.4 else rng.randrange(n_raw)
+            components.append((i, product, rng.randint(1, 5)))
+    operations = [(i, rng.randrange(10), rng.randint(5, 60)) for i in range(n_boms) for _ in range(3)]
+    return {
+        'FROM boms': boms,
+        'FROM products': products,
+        'FROM work_centers': [(wc, Decimal(40 + wc)) for wc in range(10)],
+        'FROM bom_components': components,
+        'FROM bom_operations': operations,
+    }
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--boms', type=int, default=5000)
+    parser.add_argument('--raw', type=int, default=1000, help='Raw-material products')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    engine = CostEngine()
+    graph = make_graph(args.boms, args.raw, args.seed)
+    load_ms = timed(lambda: engine._load(SyntheticCursor(graph)))
+    cold_ms = timed(engine.all_costs)
+    warm_ms = min(timed(engine.all_costs) for _ in range(3))
+    # What a price change on one raw material costs: drop its users and their ancestors.
+    before = metrics.snapshot()['counters'].get('costing.computed', 0)
+    engine._unit_costs[0] += 1
+    engine._invalidate_product(0)
+    update_ms = timed(engine.all_costs)
+    recomputed = metrics.snapshot()['counters']['costing.computed'] - before
+    print(f"boms={args.boms} components={len(graph['FROM bom_components'])}")
+    print(f"{'load graph':<28} {load_ms:>9.1f} ms")
+    print(f"{'roll-up, cold':<28} {cold_ms:>9.1f} ms")
+    print(f"{'roll-up, warm':<28} {warm_ms:>9.1f} ms")
+    print(f"{'after one price change':<28} {update_ms:>9.1f} ms ({recomputed} BOMs recomputed)")
+
+if __name__ == '__main__':
+    main()
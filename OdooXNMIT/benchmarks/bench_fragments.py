@@ -0,0 +1,73 @@
+"""Render time of 5k-row list pages with and without the fragment cache.
+
+Renders work_orders_list.html and stock_ledger.html with synthetic rows: once
+with the cache disabled, once cold (empty cache) and then warm. No database
+is needed:
+
+    python benchmarks/bench_fragments.py --rows 5000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import render_template
+
+from app import create_app, fragment_cache
+
+def make_work_orders(n):
+    return [
+        {
+            'id': i, 'operation_name': f"Operation {i % 12}", 'duration_minutes': 30 + i % 45,
+            'real_duration_minutes': 28 + i % 50, 'status': ('To Do', 'In Progress', 'Done')[i % 3],
+            'work_center_name': f"Work Center {i % 8}", 'finished_product_name': f"Product {i % 200}",
+            'mo_id': i // 3, 'start_time': datetime(2024, 1, 1) + timedelta(minutes=i), 'end_time': None,
+        }
+        for i in range(n)
+    ]
+
+def make_ledger(n):
+    return [
+        {
+            'id': i, 'timestamp': datetime(2024, 1, 1) + timedelta(minutes=i),
+            'quantity_change': (i % 20) - 10, 'reason': 'MO Consumption', 'product_name': f"Product {i % 200}",
+        }
+        for i in range(n)
+    ]
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    app = create_app({'SECRET_KEY': 'bench'})
+    pages = [
+        ('work_orders_list.html', {'work_orders': make_work_orders(args.rows), 'search_query': '',
+                                   'work_centers': [], 'work_center_id': None, 'statuses': [],
+                                   'status_filter': '', 'page': 1, 'has_next': False}),
+        ('stock_ledger.html', {'entries': make_ledger(args.rows)}),
+    ]
+    print(f"rows={args.rows}")
+    print(f"{'template':<24} {'no cache ms':>12} {'cold ms':>9} {'warm ms':>9}")
+    with app.test_request_context():
+        for template, context in pages:
+            render = lambda: render_template(template, **context)
+            render()  # compile the template outside the timings
+            app.jinja_env.fragment_cache = None
+            uncached = timed(render)
+            app.jinja_env.fragment_cache = fragment_cache
+            fragment_cache.clear()
+            cold = timed(render)
+            warm = min(timed(render) for _ in range(3))
+            print(f"{template:<24} {uncached:>12.1f} {cold:>9.1f} {warm:>9.1f}")
+
+if __name__ == '__main__':
+    main()
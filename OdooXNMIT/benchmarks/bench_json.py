@@ -0,0 +1,76 @@
+"""Serialization cost of a large /api/manufacturing-orders payload.
+
+Compares the old path (strftime every row, then Flask's default provider)
+with FastJSONProvider, in row and columnar form. No database is needed:
+
+    python benchmarks/bench_json.py --orders 10000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from json_provider import FastJSONProvider, columnar, orjson
+
+def make_orders(n):
+    start = date(2024, 1, 1)
+    return [
+        {
+            'id': i,
+            'schedule_start_date': start + timedelta(days=i % 365),
+            'quantity_to_produce': Decimal('10.00') + i % 7,
+            'status': ('Draft', 'Confirmed', 'In Progress', 'Done')[i % 4],
+            'bom_id': i % 50,
+            'product_name': f"Product {i % 200}",
+            'start_time': datetime(2024, 1, 1, 8, 0) + timedelta(minutes=i),
+            'component_status': 'Available',
+        }
+        for i in range(n)
+    ]
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000, len(body)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    fast_provider = FastJSONProvider(app)
+    orders = make_orders(args.orders)
+
+    def old_path():
+        rows = [dict(row) for row in orders]
+        for row in rows:
+            if row.get('schedule_start_date'):
+                row['schedule_start_date'] = row['schedule_start_date'].strftime('%Y-%m-%d')
+        return default_provider.dumps(rows)
+
+    cases = [
+        ('strftime + default provider', old_path),
+        ('FastJSONProvider rows', lambda: fast_provider.dumps(orders)),
+        ('FastJSONProvider columnar', lambda: fast_provider.dumps(columnar(orders))),
+    ]
+    print(f"orders={args.orders} encoder={'orjson' if orjson else 'stdlib json'}")
+    print(f"{'case':<30} {'ms':>9} {'bytes':>10}")
+    for name, fn in cases:
+        ms, size = best_of(fn, args.repeat)
+        print(f"{name:<30} {ms:>9.1f} {size:>10}")
+
+if __name__ == '__main__':
+    main()
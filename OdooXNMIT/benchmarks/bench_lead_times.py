@@ -0,0 +1,67 @@
+"""Monte Carlo lead-time simulation over a synthetic shop.
+
+Times lead_times.simulate for a backlog of open MOs, each with a few work
+orders spread over the work centers, with learned duration statistics for
+most operations. No database is needed:
+
+    python benchmarks/bench_lead_times.py --mos 2000 --trials 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from duration_stats import RunningStats
+from lead_times import MIN_SAMPLES, simulate
+
+def make_shop(n_mos, n_centers, n_operations, seed):
+    rng = random.Random(seed)
+    now = datetime(2026, 1, 5, 8)
+    rows = []
+    for mo_id in range(n_mos):
+        status = rng.choice(['In Progress', 'Confirmed', 'Confirmed', 'Draft'])
+        start = (now + timedelta(days=rng.randint(-3, 14))).date()
+        for step in range(rng.randint(2, 8)):
+            running = status == 'In Progress' and step == 0
+            rows.append({
+                'mo_id': mo_id, 'mo_status': status, 'schedule_start_date': start,
+                'wo_id': len(rows), 'work_center_id': rng.randrange(n_centers),
+                'bom_operation_id': rng.randrange(n_operations), 'duration_minutes': rng.randint(10, 120),
+                'status': 'In Progress' if running else 'To Do',
+                'start_time': now - timedelta(minutes=rng.randint(0, 60)) if running else None,
+            })
+    stats = {}
+    # Four in five operations have enough completions to use their history.
+    for op in range(n_operations):
+        if rng.random() < 0.8:
+            stats_row = RunningStats()
+            planned = rng.randint(10, 120)
+            for _ in range(MIN_SAMPLES + rng.randint(0, 50)):
+                stats_row.add(rng.lognormvariate(0, 0.3) * planned)
+            for wc in range(n_centers):
+                stats[(op, wc)] = stats_row
+    return rows, stats, now
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mos', type=int, default=2000)
+    parser.add_argument('--centers', type=int, default=20)
+    parser.add_argument('--operations', type=int, default=500)
+    parser.add_argument('--trials', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rows, stats, now = make_shop(args.mos, args.centers, args.operations, args.seed)
+    started = time.perf_counter()
+    mo_index, finish = simulate(rows, stats, now, args.trials, seed=args.seed)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"mos={args.mos} work_orders={len(rows)} trials={args.trials}")
+    print(f"{'simulate':<28} {elapsed_ms:>9.1f} ms")
+    print(f"{'per MO':<28} {elapsed_ms / max(len(mo_index), 1):>9.3f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Login throughput vs hashing worker count.
+
+Simulates a shift-change burst: `--clients` threads each verify a password
+through PasswordHasher (the same path /login uses), for every pool size in
+`--workers`. No database is needed.
+
+    python benchmarks/bench_login.py --rounds 12 --workers 1 2 4 8 --logins 64
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from password_hashing import PasswordHasher, _hash_password
+
+def run(workers, rounds, logins, clients):
+    hasher = PasswordHasher(workers=workers, max_queue=logins, rounds=rounds, timeout=600)
+    pw_hash = _hash_password('secret', rounds)
+    hasher.check(pw_hash, 'secret')  # start the pool outside the timed section
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(lambda _: hasher.check(pw_hash, 'secret'), range(logins)))
+    elapsed = time.perf_counter() - started
+    hasher.shutdown()
+    assert all(results)
+    return logins / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--logins', type=int, default=64)
+    parser.add_argument('--clients', type=int, default=32)
+    args = parser.parse_args()
+
+    print(f"bcrypt rounds={args.rounds} logins={args.logins} clients={args.clients} cpus={os.cpu_count()}")
+    print(f"{'workers':>8} {'logins/sec':>12}")
+    for workers in args.workers:
+        print(f"{workers:>8} {run(workers, args.rounds, args.logins, args.clients):>12.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Requests/sec of the production gunicorn setup at several worker counts.
+
+Starts `gunicorn -c gunicorn.conf.py` once per worker count, hammers one URL
+with `--clients` concurrent HTTP clients for `--seconds`, then stops it.
+Run from the OdooXNMIT directory with the usual .env in place:
+
+    python benchmarks/bench_wsgi.py --workers 1 4 16 --path /login
+
+Use a page that hits MySQL (e.g. --path /products with --cookie from a
+logged-in browser session) to include the database in the measurement.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def wait_until_up(url, deadline):
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1)
+            return True
+        except urllib.error.HTTPError:
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+def load(url, clients, seconds, cookie):
+    done = [0] * clients
+    errors = [0] * clients
+    stop_at = time.time() + seconds
+    headers = {'Cookie': cookie} if cookie else {}
+
+    def client(i):
+        while time.time() < stop_at:
+            try:
+                with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=10) as resp:
+                    resp.read()
+                done[i] += 1
+            except (OSError, urllib.error.HTTPError):
+                errors[i] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(done) / seconds, sum(errors)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--seconds', type=int, default=10)
+    parser.add_argument('--path', default='/login')
+    parser.add_argument('--cookie', default='')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.port}{args.path}"
+    print(f"url={url} clients={args.clients} threads/worker={args.threads} cpus={os.cpu_count()}")
+    print(f"{'workers':>8} {'req/sec':>10} {'errors':>8}")
+    for workers in args.workers:
+        env = dict(os.environ, WEB_CONCURRENCY=str(workers), WEB_THREADS=str(args.threads),
+                   BIND=f"127.0.0.1:{args.port}")
+        server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+                                  cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not wait_until_up(url, time.time() + 30):
+                print(f"{workers:>8} {'server did not start':>20}")
+                continue
+            rps, errors = load(url, args.clients, args.seconds, args.cookie)
+            print(f"{workers:>8} {rps:>10.1f} {errors:>8}")
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- App configuration ---
+# create_app() takes one of these classes (or a dict of overrides). Every value
+# can be set through the environment / .env file.
+
+class Config:
+    SECRET_KEY = os.getenv('SECRET_KEY', 'your_super_secret_key_change_this')
+
+    DB_HOST = os.getenv('DB_HOST')
+    DB_PORT = int(os.getenv('DB_PORT', '3306'))
+    DB_USER = os.getenv('DB_USER')
+    DB_PASSWORD = os.getenv('DB_PASSWORD')
+    DB_NAME = os.getenv('DB_NAME')
+    # Connections kept open per worker process; 0 disables pooling.
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '0'))
+    # Optional read replica for GET list/report pages (same user, password
+    # and database). Reads after a user's own write wait up to
+    # DB_REPLICA_WAIT_TIMEOUT seconds for the replica, then use the primary.
+    DB_REPLICA_HOST = os.getenv('DB_REPLICA_HOST')
+    DB_REPLICA_PORT = int(os.getenv('DB_REPLICA_PORT', os.getenv('DB_PORT', '3306')))
+    DB_REPLICA_WAIT_TIMEOUT = float(os.getenv('DB_REPLICA_WAIT_TIMEOUT', '0.5'))
+    # Upper bound of the aiomysql pool used by the async API (asgi.py).
+    ASYNC_DB_POOL_SIZE = int(os.getenv('ASYNC_DB_POOL_SIZE', '10'))
+
+    USER_CLAIMS_TTL = int(os.getenv('USER_CLAIMS_TTL', '60'))
+    # How often each worker re-reads the recent per-user revocations.
+    USER_CLAIMS_REVOCATION_INTERVAL = float(os.getenv('USER_CLAIMS_REVOCATION_INTERVAL', '5'))
+
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', '12'))
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', '32'))
+
+    # Responses smaller than this (bytes) are sent uncompressed.
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+    COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', '6'))
+    COMPRESS_BR_QUALITY = int(os.getenv('COMPRESS_BR_QUALITY', '4'))
+
+    # Memory cap (characters of cached HTML) for template fragments, per worker.
+    FRAGMENT_CACHE_MAX_BYTES = int(os.getenv('FRAGMENT_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+
+    # `flask archive`: finished orders and ledger rows older than this many
+    # days move to the *_archive tables, this many per transaction.
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '90'))
+    ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '500'))
+
+    # Low-stock reorders (jobs.py): triggers within this many seconds coalesce
+    # into one reorder per product; up to REORDER_BATCH_SIZE are applied per
+    # transaction and a failed batch is retried REORDER_MAX_ATTEMPTS times.
+    REORDER_COALESCE_DELAY = float(os.getenv('REORDER_COALESCE_DELAY', '0.5'))
+    REORDER_BATCH_SIZE = int(os.getenv('REORDER_BATCH_SIZE', '50'))
+    REORDER_MAX_ATTEMPTS = int(os.getenv('REORDER_MAX_ATTEMPTS', '5'))
+
+    # /api/lead-times (lead_times.py): Monte Carlo trials per request by
+    # default, and the most a ?trials= override may ask for.
+    LEAD_TIME_TRIALS = int(os.getenv('LEAD_TIME_TRIALS', '2000'))
+    LEAD_TIME_MAX_TRIALS = int(os.getenv('LEAD_TIME_MAX_TRIALS', '20000'))
+
+    # Admission control (admission.py), per worker process: how many
+    # requests of a class run at once, how many may queue for a slot and how
+    # many seconds they may wait before getting 503. Heavy's limit + queue
+    # should stay below WEB_THREADS.
+    ADMISSION_CRITICAL_LIMIT = int(os.getenv('ADMISSION_CRITICAL_LIMIT', os.getenv('WEB_THREADS', '4')))
+    ADMISSION_CRITICAL_QUEUE = int(os.getenv('ADMISSION_CRITICAL_QUEUE', '32'))
+    ADMISSION_CRITICAL_TIMEOUT = float(os.getenv('ADMISSION_CRITICAL_TIMEOUT', '10'))
+    ADMISSION_HEAVY_LIMIT = int(os.getenv('ADMISSION_HEAVY_LIMIT', '1'))
+    ADMISSION_HEAVY_QUEUE = int(os.getenv('ADMISSION_HEAVY_QUEUE', '2'))
+    ADMISSION_HEAVY_TIMEOUT = float(os.getenv('ADMISSION_HEAVY_TIMEOUT', '5'))
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+
+class ProductionConfig(Config):
+    DEBUG = False
+    SECRET_KEY = os.getenv('SECRET_KEY')
+    # One pooled connection per gunicorn thread by default.
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', os.getenv('WEB_THREADS', '4')))
+    SESSION_COOKIE_HTTPONLY = True
+    SESSION_COOKIE_SAMESITE = 'Lax'
+
+configs = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+}
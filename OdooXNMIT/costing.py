@@ -0,0 +1,256 @@
+import threading
+from decimal import Decimal
+
+import metrics
+from db import get_db_connection
+from http_cache import get_versions
+
+# --- BOM cost roll-up ---
+# Cost to make one unit of a BOM's product:
+#   material = sum(quantity_required x unit cost of the component)
+#   labour   = sum(duration_minutes / 60 x work center cost_per_hour)
+# A component made by a BOM of its own (a sub-assembly) costs that BOM's
+# total, split into its material and labour parts; a component without one
+# costs products.unit_cost. A product with several BOMs is costed through
+# the lowest-id one.
+#
+# CostEngine keeps the BOM graph of the whole database in memory (five
+# queries) and memoizes each BOM's cost. Write routes report their change
+# (refresh_bom, set_rate, ...) after committing; only that BOM and the
+# BOMs above it in the graph lose their memoized cost. Cost-affecting
+# writes also bump the 'bom_costs' counter in table_versions, which is how
+# the other worker processes notice the graph changed and reload it.
+
+ZERO = Decimal(0)
+CENT = Decimal('0.01')
+
+class BomCycleError(Exception):
+    """Raised when a BOM (indirectly) contains its own product."""
+
+class CostEngine:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.version = None
+        self._memo = {}
+
+    def init_app(self, app):
+        app.extensions['cost_engine'] = self
+
+    # --- Loading ---
+
+    def sync(self):
+        """Reload the graph if another process changed it since it was loaded."""
+        (current,) = get_versions(('bom_costs',))
+        with self._lock:
+            if self.version is not None and current <= self.version:
+                return
+            conn = get_db_connection(read_only=True)
+            try:
+                self._load(conn.cursor())
+            finally:
+                conn.close()
+            self.version = current
+
+    def _load(self, cursor):
+        cursor.execute("SELECT b.id, b.name, b.product_id FROM boms b ORDER BY b.id")
+        self._boms = {bom_id: (name, product_id) for bom_id, name, product_id in cursor.fetchall()}
+        self._bom_of_product = {}
+        for bom_id, (_, product_id) in self._boms.items():
+            self._bom_of_product.setdefault(product_id, bom_id)
+        cursor.execute("SELECT id, name, unit_cost FROM products")
+        self._product_names = {}
+        self._unit_costs = {}
+        for product_id, name, unit_cost in cursor.fetchall():
+            self._product_names[product_id] = name
+            self._unit_costs[product_id] = Decimal(unit_cost or 0)
+        cursor.execute("SELECT id, cost_per_hour FROM work_centers")
+        self._rates = {wc_id: Decimal(rate or 0) for wc_id, rate in cursor.fetchall()}
+        self._components = {}
+        self._used_in = {}
+        cursor.execute("SELECT bom_id, component_product_id, quantity_required FROM bom_components")
+        for bom_id, product_id, quantity in cursor.fetchall():
+            self._components.setdefault(bom_id, []).append((product_id, Decimal(quantity)))
+            self._used_in.setdefault(product_id, set()).add(bom_id)
+        self._operations = {}
+        self._boms_by_center = {}
+        cursor.execute("SELECT bom_id, work_center_id, duration_minutes FROM bom_operations")
+        for bom_id, wc_id, minutes in cursor.fetchall():
+            self._operations.setdefault(bom_id, []).append((wc_id, Decimal(minutes)))
+            self._boms_by_center.setdefault(wc_id, set()).add(bom_id)
+        cursor.close()
+        self._memo = {}
+        metrics.incr('costing.reloads')
+
+    # --- Costs ---
+
+    def _compute(self, bom_id, visiting):
+        cost = self._memo.get(bom_id)
+        if cost is not None:
+            return cost
+        if bom_id in visiting:
+            raise BomCycleError(bom_id)
+        visiting.add(bom_id)
+        material = labour = ZERO
+        for product_id, quantity in self._components.get(bom_id, ()):
+            sub_bom = self._bom_of_product.get(product_id)
+            if sub_bom is None:
+                material += quantity * self._unit_costs.get(product_id, ZERO)
+            else:
+                sub_material, sub_labour = self._compute(sub_bom, visiting)
+                material += quantity * sub_material
+                labour += quantity * sub_labour
+        for wc_id, minutes in self._operations.get(bom_id, ()):
+            labour += minutes * self._rates.get(wc_id, ZERO) / 60
+        visiting.discard(bom_id)
+        cost = (material, labour)
+        self._memo[bom_id] = cost
+        metrics.incr('costing.computed')
+        return cost
+
+    def _row(self, bom_id):
+        name, product_id = self._boms[bom_id]
+        row = {'bom_id': bom_id, 'bom_name': name, 'product_id': product_id,
+               'product_name': self._product_names.get(product_id)}
+        try:
+            material, labour = self._compute(bom_id, set())
+        except BomCycleError:
+            row.update(material_cost=None, labour_cost=None, total_cost=None, error='cycle')
+            return row
+        row.update(material_cost=material.quantize(CENT), labour_cost=labour.quantize(CENT),
+                   total_cost=(material + labour).quantize(CENT))
+        return row
+
+    def bom_cost(self, bom_id):
+        """Cost row of one BOM, or None if it doesn't exist."""
+        with self._lock:
+            return self._row(bom_id) if bom_id in self._boms else None
+
+    def all_costs(self, bom_ids=None):
+        with self._lock:
+            ids = self._boms if bom_ids is None else [b for b in bom_ids if b in self._boms]
+            return [self._row(bom_id) for bom_id in ids]
+
+    def unit_cost(self, product_id):
+        """What one unit of `product_id` costs as a component (None inside a cycle)."""
+        with self._lock:
+            sub_bom = self._bom_of_product.get(product_id)
+            if sub_bom is None:
+                return self._unit_costs.get(product_id, ZERO)
+            try:
+                return sum(self._compute(sub_bom, set()))
+            except BomCycleError:
+                return None
+
+    def rate(self, work_center_id):
+        with self._lock:
+            return self._rates.get(work_center_id, ZERO)
+
+    def would_cycle(self, bom_id, product_id):
+        """True if adding `product_id` as a component of `bom_id` would make the BOM contain itself."""
+        with self._lock:
+            target = self._boms[bom_id][1] if bom_id in self._boms else None
+            stack, seen = [product_id], set()
+            while stack:
+                current = stack.pop()
+                if current == target:
+                    return True
+                sub_bom = self._bom_of_product.get(current)
+                if sub_bom is None or sub_bom in seen:
+                    continue
+                seen.add(sub_bom)
+                stack.extend(component for component, _ in self._components.get(sub_bom, ()))
+            return False
+
+    # --- Incremental updates ---
+    # Called by the write routes after their commit and bump_versions(...,
+    # 'bom_costs'). If the engine isn't loaded, or another process also
+    # changed the graph in the meantime, the change is not applied here and
+    # the next sync() reloads instead. An update returning False asks for
+    # that reload as well. Updates set values rather than add to them: a
+    # sync() that read the version just before the write may already have
+    # loaded its result.
+
+    def _invalidate_bom(self, bom_id):
+        stack = [bom_id]
+        while stack:
+            current = stack.pop()
+            # A BOM without a memoized cost has no memoized ancestors either:
+            # computing an ancestor memoizes everything below it.
+            if self._memo.pop(current, None) is None and current != bom_id:
+                continue
+            product_id = self._boms[current][1]
+            if self._bom_of_product.get(product_id) == current:
+                stack.extend(self._used_in.get(product_id, ()))
+
+    def _invalidate_product(self, product_id):
+        for bom_id in self._used_in.get(product_id, ()):
+            self._invalidate_bom(bom_id)
+
+    def _apply(self, conn, update):
+        cursor = conn.cursor()
+        cursor.execute("SELECT version FROM table_versions WHERE table_name = 'bom_costs'")
+        row = cursor.fetchone()
+        cursor.close()
+        with self._lock:
+            if self.version is None or row is None or row[0] != self.version + 1 or update() is False:
+                self.version = None
+                return
+            self.version = row[0]
+            metrics.incr('costing.incremental_updates')
+
+    def add_bom(self, conn, bom_id, name, product_id):
+        def update():
+            if product_id not in self._product_names:
+                return False  # a product created since the last load
+            self._boms[bom_id] = (name, product_id)
+            if product_id not in self._bom_of_product:
+                self._bom_of_product[product_id] = bom_id
+                # Users of the product now roll up through the new BOM.
+                self._invalidate_product(product_id)
+        self._apply(conn, update)
+
+    def refresh_bom(self, conn, bom_id):
+        """Re-read one BOM's components and operations after they changed."""
+        # Replacing the lists from the database (rather than appending the
+        # new row) keeps this right when the last sync() already loaded it.
+        cursor = conn.cursor()
+        cursor.execute("SELECT component_product_id, quantity_required FROM bom_components WHERE bom_id = %s", (bom_id,))
+        components = [(product_id, Decimal(quantity)) for product_id, quantity in cursor.fetchall()]
+        cursor.execute("SELECT work_center_id, duration_minutes FROM bom_operations WHERE bom_id = %s", (bom_id,))
+        operations = [(wc_id, Decimal(minutes)) for wc_id, minutes in cursor.fetchall()]
+        cursor.close()
+
+        def update():
+            if bom_id not in self._boms:
+                return False
+            if any(product_id not in self._product_names for product_id, _ in components):
+                return False  # a product created since the last load
+            if any(wc_id not in self._rates for wc_id, _ in operations):
+                return False  # a work center created since the last load
+            for product_id, _ in self._components.get(bom_id, ()):
+                self._used_in.get(product_id, set()).discard(bom_id)
+            for wc_id, _ in self._operations.get(bom_id, ()):
+                self._boms_by_center.get(wc_id, set()).discard(bom_id)
+            self._components[bom_id] = components
+            self._operations[bom_id] = operations
+            for product_id, _ in components:
+                self._used_in.setdefault(product_id, set()).add(bom_id)
+            for wc_id, _ in operations:
+                self._boms_by_center.setdefault(wc_id, set()).add(bom_id)
+            self._invalidate_bom(bom_id)
+        self._apply(conn, update)
+
+    def set_rate(self, conn, work_center_id, rate):
+        def update():
+            self._rates[work_center_id] = Decimal(rate)
+            for bom_id in self._boms_by_center.get(work_center_id, ()):
+                self._invalidate_bom(bom_id)
+        self._apply(conn, update)
+
+    def set_product(self, conn, product_id, name, unit_cost):
+        def update():
+            self._product_names[product_id] = name
+            if self._unit_costs.get(product_id) != Decimal(unit_cost):
+                self._unit_costs[product_id] = Decimal(unit_cost)
+                self._invalidate_product(product_id)
+        self._apply(conn, update)
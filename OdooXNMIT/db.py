@@ -0,0 +1,161 @@
+import os
+import threading
+
+import mysql.connector
+from mysql.connector import pooling
+from flask import current_app, g, has_app_context, has_request_context, session
+
+import metrics
+
+# --- Database connections ---
+# Each worker process lazily builds its own pool the first time it needs a
+# connection. Pools are keyed by pid, so a pool can never be shared across a
+# fork (gunicorn preloads the app in the master before forking workers).
+# conn.close() on a pooled connection hands it back to the pool. Every
+# connection handed out inside an app context is also remembered on `g` and
+# closed when the context ends, so an early return or an exception in a
+# route can't keep it out of the pool for good.
+#
+# With DB_REPLICA_HOST set there is a second pool per process for a read
+# replica. get_db_connection(read_only=True) (GET list/report pages and the
+# ETag version lookup) uses it; everything else stays on the primary.
+# Read-your-writes: after a write commits, record_write() stores the
+# primary's executed GTID set in the user's session. That user's next
+# replica read first waits (WAIT_FOR_EXECUTED_GTID_SET, at most
+# DB_REPLICA_WAIT_TIMEOUT seconds) for the replica to apply it, and reads
+# from the primary instead if it hasn't. Requires gtid_mode=ON.
+
+PRIMARY = 'primary'
+REPLICA = 'replica'
+WRITE_POSITION_KEY = '_db_gtid'
+
+_lock = threading.Lock()
+_pools = {}
+
+def connection_args(config, role=PRIMARY):
+    args = {
+        'host': config['DB_HOST'],
+        'port': int(config.get('DB_PORT') or 3306),
+        'user': config['DB_USER'],
+        'password': config['DB_PASSWORD'],
+        'database': config['DB_NAME'],
+    }
+    if role == REPLICA:
+        args['host'] = config['DB_REPLICA_HOST']
+        args['port'] = int(config.get('DB_REPLICA_PORT') or args['port'])
+    return args
+
+def _get_pool(config, role=PRIMARY):
+    key = (os.getpid(), role)
+    pool = _pools.get(key)
+    if pool is None:
+        with _lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = pooling.MySQLConnectionPool(
+                    pool_name=f"mfg-{role}-{key[0]}",
+                    pool_size=config['DB_POOL_SIZE'],
+                    **connection_args(config, role)
+                )
+                _pools[key] = pool
+    return pool
+
+def _connect(config, role):
+    if not config.get('DB_POOL_SIZE'):
+        return mysql.connector.connect(**connection_args(config, role))
+    try:
+        return _get_pool(config, role).get_connection()
+    except pooling.PoolError:
+        # Pool exhausted: serve the request with a one-off connection rather than fail it.
+        metrics.incr('db.pool_overflow')
+        return mysql.connector.connect(**connection_args(config, role))
+
+def _replica_caught_up(conn, position, timeout):
+    cursor = conn.cursor()
+    cursor.execute("SELECT WAIT_FOR_EXECUTED_GTID_SET(%s, %s)", (position, timeout))
+    (timed_out,) = cursor.fetchone()
+    cursor.close()
+    return timed_out == 0
+
+def _replica_connection(config):
+    """A replica connection that has seen this user's last write, or None to use the primary."""
+    in_request = has_request_context()
+    # Decided once per request, so the ETag lookup and the page's own
+    # queries read the same server.
+    if in_request and g.get('db_read_role') == PRIMARY:
+        return None
+    try:
+        conn = _connect(config, REPLICA)
+    except mysql.connector.Error:
+        metrics.incr('db.replica_unavailable')
+        return None
+    position = session.get(WRITE_POSITION_KEY) if in_request else None
+    if position:
+        if not _replica_caught_up(conn, position, config.get('DB_REPLICA_WAIT_TIMEOUT', 0.5)):
+            metrics.incr('db.replica_lagging')
+            conn.close()
+            g.db_read_role = PRIMARY
+            return None
+        # Replicas only move forward: once caught up, later reads need no wait.
+        session.pop(WRITE_POSITION_KEY, None)
+    if in_request:
+        g.db_read_role = REPLICA
+    metrics.incr('db.replica_reads')
+    return conn
+
+def _track(conn):
+    if has_app_context():
+        g.setdefault('db_connections', []).append(conn)
+    return conn
+
+def get_db_connection(read_only=False):
+    """A primary connection; read_only=True may return a replica connection instead."""
+    config = current_app.config
+    if read_only and config.get('DB_REPLICA_HOST'):
+        conn = _replica_connection(config)
+        if conn is not None:
+            return _track(conn)
+    return _track(_connect(config, PRIMARY))
+
+def _is_open(conn):
+    if isinstance(conn, pooling.PooledMySQLConnection):
+        return conn._cnx is not None  # close() hands it back and drops the reference
+    return conn.is_connected()
+
+def close_context_connections(exc=None):
+    """Roll back and close whatever the request (or CLI command, or job) left open."""
+    for conn in g.pop('db_connections', ()):
+        try:
+            if _is_open(conn):
+                metrics.incr('db.closed_on_teardown')
+                conn.rollback()
+                conn.close()
+        except mysql.connector.Error:
+            pass
+
+def init_app(app):
+    app.teardown_appcontext(close_context_connections)
+
+def record_write(conn):
+    """Remember the primary's position after a commit on `conn` (see above)."""
+    if not current_app.config.get('DB_REPLICA_HOST') or not has_request_context():
+        return
+    cursor = conn.cursor()
+    cursor.execute("SELECT @@GLOBAL.gtid_executed")
+    (position,) = cursor.fetchone()
+    cursor.close()
+    if position:
+        session[WRITE_POSITION_KEY] = position
+    # Reads later in this same request must wait for the write as well.
+    g.pop('db_read_role', None)
+
+def dispose_pools():
+    """Forget pools that belong to another process (call after fork) and close our own."""
+    with _lock:
+        for (pid, role), pool in list(_pools.items()):
+            if pid == os.getpid():
+                try:
+                    pool._remove_connections()
+                except mysql.connector.Error:
+                    pass
+            del _pools[(pid, role)]
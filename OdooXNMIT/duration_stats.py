@@ -0,0 +1,183 @@
+import json
+import math
+from bisect import insort
+
+# --- Operation duration statistics ---
+# One row per (BOM operation, work center) in operation_duration_stats,
+# updated in O(1) inside complete_work_order's transaction from the
+# finished work order's real duration alone, never by rescanning history:
+#   count / mean / M2   Welford's running mean and variance
+#   p50 / p90           P-squared quantile sketches (five markers each)
+#   ewma                exponentially weighted mean, to spot recent drift
+# /api/operation-durations compares them with bom_operations.duration_minutes
+# and suggests a new standard duration (the running median).
+
+QUANTILES = (0.5, 0.9)
+EWMA_ALPHA = 0.2
+
+class P2Quantile:
+    """Jain & Chlamtac's P-squared estimate of the p-quantile in constant space."""
+
+    def __init__(self, p, state=None):
+        self.p = p
+        state = state or {}
+        # Until five samples are seen `heights` holds them sorted and
+        # `positions` is None.
+        self.heights = state.get('q', [])
+        self.positions = state.get('n')
+        self.desired = state.get('np')
+
+    def state(self):
+        return {'q': self.heights, 'n': self.positions, 'np': self.desired}
+
+    def add(self, x):
+        q, n = self.heights, self.positions
+        if n is None:
+            insort(q, x)
+            if len(q) == 5:
+                p = self.p
+                self.positions = [0, 1, 2, 3, 4]
+                self.desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+        for i in range(k + 1, 5):
+            n[i] += 1
+        p = self.p
+        for i, step in enumerate((0, p / 2, p, (1 + p) / 2, 1)):
+            self.desired[i] += step
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                candidate = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < candidate < q[i + 1]:
+                    candidate = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = candidate
+                n[i] += d
+
+    def value(self):
+        if self.positions is not None:
+            return self.heights[2]
+        if not self.heights:
+            return None
+        return self.heights[round(self.p * (len(self.heights) - 1))]
+
+class RunningStats:
+    def __init__(self, row=None):
+        row = row or {}
+        self.count = row.get('sample_count') or 0
+        self.mean = row.get('mean_minutes') or 0.0
+        self.m2 = row.get('m2') or 0.0
+        self.ewma = row.get('ewma_minutes')
+        self.min = row.get('min_minutes')
+        self.max = row.get('max_minutes')
+        sketch = json.loads(row['sketch']) if row.get('sketch') else {}
+        self.quantiles = {p: P2Quantile(p, sketch.get(str(p))) for p in QUANTILES}
+
+    def add(self, x):
+        x = float(x)
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.ewma = x if self.ewma is None else EWMA_ALPHA * x + (1 - EWMA_ALPHA) * self.ewma
+        self.min = x if self.min is None else min(self.min, x)
+        self.max = x if self.max is None else max(self.max, x)
+        for sketch in self.quantiles.values():
+            sketch.add(x)
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def quantile(self, p):
+        return self.quantiles[p].value()
+
+    def row(self):
+        return {
+            'sample_count': self.count, 'mean_minutes': self.mean, 'm2': self.m2,
+            'ewma_minutes': self.ewma, 'min_minutes': self.min, 'max_minutes': self.max,
+            'sketch': json.dumps({str(p): s.state() for p, s in self.quantiles.items()}),
+        }
+
+STATS_COLUMNS = ('sample_count', 'mean_minutes', 'm2', 'ewma_minutes', 'min_minutes', 'max_minutes', 'sketch')
+
+def record_completion(cursor, bom_operation_id, work_center_id, minutes):
+    """Fold one finished work order into its stats row. Runs in the caller's transaction."""
+    # Make sure the row exists first so the FOR UPDATE takes a row lock, not
+    # a gap lock two first completions could deadlock on.
+    cursor.execute(
+        "INSERT IGNORE INTO operation_duration_stats (bom_operation_id, work_center_id) VALUES (%s, %s)",
+        (bom_operation_id, work_center_id)
+    )
+    cursor.execute(
+        f"SELECT {', '.join(STATS_COLUMNS)} FROM operation_duration_stats "
+        "WHERE bom_operation_id = %s AND work_center_id = %s FOR UPDATE",
+        (bom_operation_id, work_center_id)
+    )
+    row = cursor.fetchone()
+    if not isinstance(row, dict):
+        row = dict(zip(STATS_COLUMNS, row))
+    stats = RunningStats(row)
+    stats.add(minutes)
+    values = stats.row()
+    cursor.execute(
+        f"UPDATE operation_duration_stats SET {', '.join(f'{col} = %s' for col in STATS_COLUMNS)} "
+        "WHERE bom_operation_id = %s AND work_center_id = %s",
+        tuple(values[col] for col in STATS_COLUMNS) + (bom_operation_id, work_center_id)
+    )
+
+def _pct(value, planned):
+    return round((value - planned) / planned * 100, 1) if planned else None
+
+def drift_report(cursor, min_samples=5, threshold=0.15, include_all=False):
+    """Operations whose observed durations drifted more than `threshold` from the plan."""
+    cursor.execute(f"""
+        SELECT s.bom_operation_id, s.work_center_id, {', '.join('s.' + col for col in STATS_COLUMNS)},
+               bo.name AS operation_name, bo.bom_id, bo.duration_minutes AS planned_minutes,
+               wc.name AS work_center_name
+        FROM operation_duration_stats s
+        JOIN bom_operations bo ON bo.id = s.bom_operation_id
+        JOIN work_centers wc ON wc.id = s.work_center_id
+        WHERE s.sample_count >= %s
+        ORDER BY s.bom_operation_id, s.work_center_id
+    """, (min_samples,))
+    report = []
+    for row in cursor.fetchall():
+        stats = RunningStats(row)
+        planned = row['planned_minutes']
+        median = stats.quantile(0.5)
+        drift = (stats.mean - planned) / planned if planned else None
+        recent_drift = (stats.ewma - planned) / planned if planned else None
+        flagged = planned == 0 or abs(drift) > threshold or abs(recent_drift) > threshold
+        if not (flagged or include_all):
+            continue
+        report.append({
+            'bom_operation_id': row['bom_operation_id'],
+            'bom_id': row['bom_id'],
+            'operation_name': row['operation_name'],
+            'work_center_id': row['work_center_id'],
+            'work_center_name': row['work_center_name'],
+            'samples': stats.count,
+            'planned_minutes': planned,
+            'mean_minutes': round(stats.mean, 1),
+            'stddev_minutes': round(stats.stddev, 1),
+            'p50_minutes': round(median, 1),
+            'p90_minutes': round(stats.quantile(0.9), 1),
+            'recent_minutes': round(stats.ewma, 1),
+            'drift_pct': _pct(stats.mean, planned),
+            'recent_drift_pct': _pct(stats.ewma, planned),
+            'flagged': flagged,
+            'suggested_minutes': max(1, round(median)),
+        })
+    return report
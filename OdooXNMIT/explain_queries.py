@@ -0,0 +1,181 @@
+import ast
+import os
+import re
+
+import click
+from flask.cli import with_appcontext
+
+from db import get_db_connection
+import duration_stats
+import jobs
+import queries
+from queries import MO_STATUSES, archived, build_mo_list_query, build_stock_ledger_query
+import read_models
+
+# --- Query plan check ---
+# `flask explain-queries` runs EXPLAIN for every SQL statement in the app's
+# modules (string literals found with ast; f-strings are skipped) plus the
+# variants the dynamic list builders and the other f-string statements
+# produce, and flags plans that scan a whole table (type = ALL). Three kinds of scan are expected and only listed:
+# statements without a WHERE clause (full list pages), leading-wildcard
+# LIKE searches and the materialized UNION ALL of include_archive queries.
+# Anything else makes the command exit non-zero. Run it against a database
+# with realistic row counts; on near-empty tables MySQL prefers scans
+# whatever the indexes are.
+
+SOURCE_MODULES = ('app.py', 'queries.py', 'read_models.py', 'archive.py', 'lead_times.py', 'jobs.py',
+                  'costing.py', 'duration_stats.py')
+
+# Case-sensitive: the app writes SQL keywords in capitals, and help texts like
+# "Delete job_runs records ..." must not be taken for statements.
+_EXPLAINABLE = re.compile(r'^\s*(SELECT|UPDATE|DELETE)\b')
+_BEFORE_PLACEHOLDER = re.compile(r'(\w+)\s*(=|<>|!=|<=|>=|<|>|LIKE|IN\s*\()?\s*$', re.I)
+
+def statements_in(path):
+    """[(line, sql)] for every string literal in `path` that looks like an explainable statement."""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    # String parts of f-strings are only fragments of a statement.
+    in_fstrings = {id(part) for node in ast.walk(tree) if isinstance(node, ast.JoinedStr) for part in node.values}
+    return sorted(
+        (node.lineno, node.value) for node in ast.walk(tree)
+        if isinstance(node, ast.Constant) and isinstance(node.value, str)
+        and id(node) not in in_fstrings and _EXPLAINABLE.match(node.value)
+    )
+
+def sample_params(sql):
+    """Plausible values for each %s, guessed from the column or keyword in front of it."""
+    params = []
+    for match in re.finditer(r'%s', sql):
+        before = _BEFORE_PLACEHOLDER.search(sql[:match.start()])
+        word = before.group(1).lower() if before else ''
+        operator = (before.group(2) or '').upper() if before else ''
+        if operator == 'LIKE':
+            params.append('%x%')
+        elif word in ('limit', 'offset') or word == 'id' or word.endswith('_id') or word.endswith('.id'):
+            params.append(1)
+        elif 'quantity' in word or 'minutes' in word or word == 'version':
+            params.append(1)
+        elif 'date' in word or 'time' in word:
+            params.append('2000-01-01')
+        else:
+            params.append('x')
+    return tuple(params)
+
+def generated_statements():
+    """The dynamic list queries, one per filter the UI offers."""
+    cases = []
+    # include_archive=True reads the hot and archive tables through UNION ALL.
+    for include_archive in (False, True):
+        suffix = ', include_archive=True' if include_archive else ''
+        for active_filter in ['All'] + MO_STATUSES + ['Late', 'Not Assigned']:
+            for owner in ('all', 'my'):
+                sql, params = build_mo_list_query(active_filter, '', owner, 1, include_archive)
+                cases.append((f"build_mo_list_query({active_filter!r}, owner={owner!r}{suffix})", sql, params))
+        sql, params = build_mo_list_query('All', 'widget', 'all', 1, include_archive)
+        cases.append((f"build_mo_list_query(search{suffix})", sql, params))
+        cases.append((f"build_stock_ledger_query({suffix[2:]})", build_stock_ledger_query(include_archive), ()))
+    # Detail pages of archived orders read the archive tables.
+    for name in ('MO_HEADER_SQL', 'MO_COMPONENTS_SQL', 'MO_WORK_ORDERS_SQL', 'MO_HISTORY_SQL'):
+        cases.append((f"archived({name})", archived(getattr(queries, name)), (1,)))
+
+    class Recorder:
+        def __init__(self):
+            self.statements = []
+
+        def execute(self, sql, params=()):
+            self.sql, self.params = sql, params
+            if _EXPLAINABLE.match(sql):
+                self.statements.append((sql, params))
+
+        def fetchone(self):
+            return {}
+
+        def fetchall(self):
+            return []
+
+    for label, kwargs in [
+        ('list_work_orders()', {}),
+        ('list_work_orders(work_center)', {'work_center_id': 1}),
+        ('list_work_orders(status)', {'status': 'To Do'}),
+        ('list_work_orders(work_center, status)', {'work_center_id': 1, 'status': 'To Do'}),
+        ('list_work_orders(search)', {'search_query': 'widget'}),
+    ]:
+        recorder = Recorder()
+        read_models.list_work_orders(recorder, **kwargs)
+        cases.append((label, recorder.sql, recorder.params))
+
+    # f-string statements outside the list builders.
+    cases.append(("jobs.lock_products_sql(3)", jobs.lock_products_sql(3), (1, 2, 3)))
+    recorder = Recorder()
+    duration_stats.record_completion(recorder, 1, 1, 10)
+    for i, (sql, params) in enumerate(recorder.statements):
+        cases.append((f"record_completion() #{i + 1}", sql, params))
+    recorder = Recorder()
+    duration_stats.drift_report(recorder)
+    cases.append(("drift_report()", recorder.sql, recorder.params))
+    return cases
+
+def collect(base_dir=None):
+    base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+    cases = []
+    for module in SOURCE_MODULES:
+        for line, sql in statements_in(os.path.join(base_dir, module)):
+            cases.append((f"{module}:{line}", sql, sample_params(sql)))
+    return cases + generated_statements()
+
+def classify(sql):
+    flat = ' '.join(sql.split()).upper()
+    if ' WHERE ' not in flat:
+        return 'unfiltered'
+    if re.search(r"LIKE\s+('%|%S)", flat):
+        return 'wildcard search'
+    return 'full scan'
+
+def check(cursor, cases):
+    """EXPLAIN every case. Returns [(label, sql, table, rows, kind)] for plans with type = ALL."""
+    findings = []
+    for label, sql, params in cases:
+        try:
+            cursor.execute("EXPLAIN " + sql, params)
+            plan = cursor.fetchall()
+        except Exception as e:  # a statement EXPLAIN can't take shouldn't stop the report
+            findings.append((label, sql, None, None, f"error: {e}"))
+            continue
+        for row in plan:
+            if row.get('type') == 'ALL':
+                table = row.get('table') or ''
+                # include_archive's UNION ALL is materialized and read whole; the
+                # plan rows of the hot and archive tables inside it are checked.
+                kind = 'derived table' if table.startswith(('<derived', '<union')) else classify(sql)
+                findings.append((label, sql, table, row.get('rows'), kind))
+    return findings
+
+def init_app(app):
+    app.cli.add_command(explain_command)
+
+@click.command('explain-queries')
+@click.option('--verbose', is_flag=True, help='Print the SQL of every flagged statement.')
+@with_appcontext
+def explain_command(verbose):
+    """EXPLAIN the app's queries and flag full table scans."""
+    cases = collect()
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        findings = check(cursor, cases)
+        cursor.close()
+        conn.rollback()
+    finally:
+        conn.close()
+    failures = 0
+    for label, sql, table, rows, kind in findings:
+        expected = kind in ('unfiltered', 'wildcard search', 'derived table')
+        failures += not expected
+        detail = kind if table is None else f"{kind} of {table} (~{rows} rows)"
+        click.echo(f"{'  ' if expected else '!!'} {label}: {detail}")
+        if verbose:
+            click.echo('     ' + ' '.join(sql.split()))
+    click.echo(f"Checked {len(cases)} statements: {failures} unexpected full scan(s).")
+    if failures:
+        raise SystemExit(1)
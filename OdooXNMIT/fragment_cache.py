@@ -0,0 +1,121 @@
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+import metrics
+
+# --- Template fragment cache ---
+# {% fragment 'wo_row', wo.id, wo %} ... {% endfragment %}
+#
+# The rendered HTML of the block is cached under (name, entity id, version).
+# The version is any value (usually the row itself); dicts and lists are
+# frozen into tuples, so a row whose displayed fields changed gets a new key
+# and the stale entry simply ages out. That keeps every worker correct
+# without cross-process messages. Write routes also call invalidate() for
+# the entities they touch so stale entries leave memory right away. Entries
+# are evicted least-recently-used once the cache holds more than `max_bytes`
+# of HTML.
+
+_SCALARS = (str, int, float, bool, Decimal, date, datetime, type(None))
+
+def _freeze(value):
+    if isinstance(value, dict):
+        # Rows from the same query always list their columns in the same order.
+        items = tuple(value.items())
+        if all(isinstance(v, _SCALARS) for _, v in items):
+            return items
+        return tuple((k, _freeze(v)) for k, v in items)
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, _SCALARS):
+        return value
+    return repr(value)
+
+class FragmentCache:
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        # (name, entity id) -> keys of every cached version of that entity
+        self._by_entity = {}
+        self.size = 0
+
+    def init_app(self, app):
+        self.max_bytes = app.config.get('FRAGMENT_CACHE_MAX_BYTES', self.max_bytes)
+        app.jinja_env.add_extension(FragmentCacheExtension)
+        app.jinja_env.fragment_cache = self
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+        metrics.incr('fragment_cache.hits' if html is not None else 'fragment_cache.misses')
+        return html
+
+    def set(self, key, html):
+        size = len(html)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = html
+            self._by_entity.setdefault(key[:2], set()).add(key)
+            self.size += size
+            while self.size > self.max_bytes:
+                old_key, old_html = self._entries.popitem(last=False)
+                self._forget(old_key, old_html)
+                metrics.incr('fragment_cache.evictions')
+
+    def _forget(self, key, html):
+        self.size -= len(html)
+        keys = self._by_entity.get(key[:2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_entity[key[:2]]
+
+    def invalidate(self, name, entity_id):
+        with self._lock:
+            for key in self._by_entity.pop((name, entity_id), ()):
+                html = self._entries.pop(key, None)
+                if html is not None:
+                    self.size -= len(html)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_entity.clear()
+            self.size = 0
+
+class FragmentCacheExtension(Extension):
+    tags = {'fragment'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endfragment'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [nodes.List(args)]), [], [], body).set_lineno(lineno)
+
+    def _render(self, args, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        name, entity_id, *version = args
+        key = (name, entity_id, _freeze(version))
+        html = cache.get(key)
+        if html is None:
+            html = caller()
+            cache.set(key, html)
+        return html
@@ -0,0 +1,27 @@
+import multiprocessing
+import os
+
+# --- gunicorn settings (all overridable through the environment) ---
+wsgi_app = 'wsgi:application'
+bind = os.getenv('BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('WEB_THREADS', '4'))
+worker_class = 'gthread'
+# Build the app once in the master; workers inherit it copy-on-write.
+# Nothing in create_app() opens a connection, so no socket crosses the fork.
+preload_app = True
+timeout = int(os.getenv('WEB_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('WEB_KEEPALIVE', '5'))
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', '0'))
+max_requests_jitter = int(os.getenv('WEB_MAX_REQUESTS_JITTER', '0'))
+accesslog = os.getenv('WEB_ACCESS_LOG')
+
+def post_fork(server, worker):
+    # Drop anything the master may have created; pools are rebuilt lazily per worker.
+    from db import dispose_pools
+    dispose_pools()
+
+def worker_exit(server, worker):
+    from app import shutdown
+    shutdown()
@@ -0,0 +1,131 @@
+import gzip
+import hashlib
+from datetime import date
+from functools import wraps
+
+from flask import request, session, make_response, current_app
+from flask_login import current_user
+
+import metrics
+from db import get_db_connection, record_write
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# --- Conditional requests ---
+# Every write route bumps a counter per table it changed (table_versions).
+# A cached GET page's ETag is built from the counters of the tables it reads,
+# so checking whether the client's copy is current costs one primary-key
+# lookup instead of re-running the page's queries or hashing its body.
+# The table itself is created by migrations/0001_initial_schema.sql.
+
+def bump_versions_sql(tables):
+    placeholders = ', '.join(['(%s, 1)'] * len(tables))
+    sql = (f"INSERT INTO table_versions (table_name, version) VALUES {placeholders} "
+           "ON DUPLICATE KEY UPDATE version = version + 1")
+    return sql, tuple(tables)
+
+def bump_versions(conn, *tables):
+    """Mark `tables` as changed. Call after the data change is committed.
+
+    Bumping after the commit means a reader can at worst pair new data with
+    the old version (and refetch once more later), never cache old data
+    under a new version. It also keeps the counter rows out of the write
+    transaction, so they are not locked for its whole duration.
+
+    Every write route calls this, so it is also where the user's
+    read-your-writes position for replica reads is recorded.
+    """
+    cursor = conn.cursor()
+    cursor.execute(*bump_versions_sql(tables))
+    conn.commit()
+    cursor.close()
+    record_write(conn)
+
+def get_versions(tables):
+    # Same server as the page's own read, so a version is never paired with
+    # data older than it.
+    conn = get_db_connection(read_only=True)
+    cursor = conn.cursor()
+    placeholders = ', '.join(['%s'] * len(tables))
+    cursor.execute(f"SELECT table_name, version FROM table_versions WHERE table_name IN ({placeholders})", tuple(tables))
+    versions = dict(cursor.fetchall())
+    cursor.close()
+    conn.close()
+    return [versions.get(table, 0) for table in tables]
+
+def conditional(*tables):
+    """Answer GETs with 304 Not Modified when none of `tables` changed.
+
+    The ETag also covers the endpoint, its arguments, the user (pages are
+    per-user: "My" filters, assignee names) and today's date (the "Late"
+    filter depends on CURDATE()).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Pages showing flashed messages must be rendered for real.
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+            key = '|'.join([
+                request.endpoint,
+                repr(sorted(kwargs.items())),
+                request.query_string.decode('latin-1'),
+                str(current_user.get_id()),
+                date.today().isoformat(),
+                ','.join(str(v) for v in get_versions(tables)),
+            ])
+            etag = hashlib.sha1(key.encode('utf-8')).hexdigest()
+            if request.if_none_match.contains_weak(etag):
+                metrics.incr('http_cache.not_modified')
+                response = make_response('', 304)
+            else:
+                metrics.incr('http_cache.full')
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
+
+# --- Response compression ---
+
+COMPRESSIBLE_TYPES = {'text/html', 'text/plain', 'text/css', 'application/json', 'application/javascript'}
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+def compress_response(response):
+    config = current_app.config
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < config.get('COMPRESS_MIN_SIZE', 1024):
+        return response
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+    if encoding == 'br':
+        compressed = brotli.compress(body, quality=config.get('COMPRESS_BR_QUALITY', 4))
+    else:
+        compressed = gzip.compress(body, compresslevel=config.get('COMPRESS_GZIP_LEVEL', 6))
+    metrics.incr(f'http_cache.compressed.{encoding}')
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def init_app(app):
+    app.after_request(compress_response)
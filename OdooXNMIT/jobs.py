@@ -0,0 +1,224 @@
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+import metrics
+from db import get_db_connection
+from http_cache import bump_versions
+
+# --- Background reorders ---
+# produce_manufacturing_order used to apply "Automatic Reorder" stock
+# increases inside the production transaction, holding the product row
+# locks for longer. Now it only enqueues the product ids that fell below
+# min_stock_level after it commits. A worker thread per process waits
+# `delay` seconds so bursts coalesce into one pending job per product, then
+# applies up to `batch_size` jobs in a single transaction.
+#
+# Each job carries an idempotency key recorded in job_runs in the same
+# transaction as the stock change, so a retry after an ambiguous failure
+# (commit went through, the connection did not) can't reorder twice. Stock
+# is re-checked under the row lock: a product that is back above its
+# minimum is skipped. Failed batches are retried with exponential backoff
+# up to `max_attempts`. Jobs live in memory; `flask reorder-sweep` re-queues
+# every product below its minimum (e.g. after a crash) and applies them.
+
+class ReorderQueue:
+    def __init__(self, batch_size=50, delay=0.5, max_attempts=5, backoff=1.0):
+        self.batch_size = batch_size
+        self.delay = delay
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._app = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        # product_id -> job dict; one pending job per product
+        self._pending = {}
+        self._thread = None
+        self._pid = None
+        self._stopping = False
+
+    def init_app(self, app):
+        self._app = app
+        self.batch_size = app.config.get('REORDER_BATCH_SIZE', self.batch_size)
+        self.delay = app.config.get('REORDER_COALESCE_DELAY', self.delay)
+        self.max_attempts = app.config.get('REORDER_MAX_ATTEMPTS', self.max_attempts)
+        app.extensions['reorder_queue'] = self
+        app.cli.add_command(sweep_command)
+
+    def enqueue(self, product_id, mo_id=None):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Jobs queued in the parent before a fork belong to the parent.
+                self._pending = {}
+            job = self._pending.get(product_id)
+            if job is not None:
+                job['triggers'] += 1
+                metrics.incr('jobs.reorder.coalesced')
+            else:
+                self._pending[product_id] = {
+                    'key': f"reorder-{product_id}-{uuid.uuid4().hex}",
+                    'product_id': product_id,
+                    'mo_id': mo_id,
+                    'triggers': 1,
+                    'attempts': 0,
+                    'due': time.monotonic() + self.delay,
+                }
+                metrics.incr('jobs.reorder.enqueued')
+            self._ensure_worker()
+        self._wakeup.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _ensure_worker(self):
+        # Called with the lock held. Threads don't survive a fork, so every
+        # server worker process starts its own.
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            self._pid = os.getpid()
+            self._stopping = False
+            self._thread = threading.Thread(target=self._work, name='reorder-queue', daemon=True)
+            self._thread.start()
+
+    def _take_due(self, now):
+        with self._lock:
+            batch = []
+            if any(job['due'] <= now for job in self._pending.values()):
+                # Once one job is due, jobs still inside their coalescing
+                # window ride along so a burst becomes a single transaction.
+                batch = sorted((job for job in self._pending.values() if job['due'] <= now + self.delay),
+                               key=lambda job: job['due'])[:self.batch_size]
+            for job in batch:
+                del self._pending[job['product_id']]
+            next_due = min((job['due'] for job in self._pending.values()), default=None)
+        return batch, next_due
+
+    def _work(self):
+        while not self._stopping:
+            batch, next_due = self._take_due(time.monotonic())
+            if batch:
+                self._process(batch)
+                continue
+            timeout = None if next_due is None else max(0.0, next_due - time.monotonic())
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def _process(self, batch):
+        started = time.perf_counter()
+        try:
+            with self._app.app_context():
+                outcomes = apply_reorders(batch)
+        except Exception as e:
+            self._retry(batch, e)
+            return
+        for outcome in outcomes.values():
+            metrics.incr(f'jobs.reorder.{outcome}')
+        metrics.observe('jobs.reorder.batch_ms', (time.perf_counter() - started) * 1000)
+
+    def _retry(self, batch, error):
+        with self._lock:
+            for job in batch:
+                job['attempts'] += 1
+                if job['attempts'] >= self.max_attempts:
+                    metrics.incr('jobs.reorder.failed')
+                    self._app.logger.error("Reorder of product %s failed %s times, giving up: %s",
+                                           job['product_id'], job['attempts'], error)
+                    continue
+                metrics.incr('jobs.reorder.retried')
+                job['due'] = time.monotonic() + self.backoff * 2 ** (job['attempts'] - 1)
+                newer = self._pending.get(job['product_id'])
+                if newer is not None:
+                    # A trigger arrived meanwhile; keep the older key so an
+                    # ambiguous first attempt is still recognised.
+                    job['triggers'] += newer['triggers']
+                self._pending[job['product_id']] = job
+
+    def flush(self, timeout=10):
+        """Apply every pending job now, on the calling thread. Returns False if jobs remain."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                for job in self._pending.values():
+                    job['due'] = min(job['due'], time.monotonic())
+            batch, _ = self._take_due(time.monotonic())
+            if not batch:
+                return self.pending() == 0
+            self._process(batch)
+        return self.pending() == 0
+
+    def shutdown(self, timeout=5):
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
+        if self._app is not None and self.pending():
+            self.flush(timeout)
+
+def lock_products_sql(count):
+    """Locks `count` products (ids as params) in id order, so concurrent batches can't deadlock."""
+    placeholders = ', '.join(['%s'] * count)
+    return (f"SELECT id, on_hand_quantity, min_stock_level, reorder_quantity FROM products "
+            f"WHERE id IN ({placeholders}) ORDER BY id FOR UPDATE")
+
+def apply_reorders(jobs):
+    """Apply `jobs` in one transaction. Returns {key: 'applied' | 'skipped' | 'duplicate'}."""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    outcomes = {}
+    try:
+        product_ids = tuple(job['product_id'] for job in jobs)
+        cursor.execute(lock_products_sql(len(product_ids)), product_ids)
+        products = {row['id']: row for row in cursor.fetchall()}
+        for job in jobs:
+            product = products.get(job['product_id'])
+            outcome = 'skipped'
+            if product is not None and product['on_hand_quantity'] < product['min_stock_level'] and product['reorder_quantity'] > 0:
+                outcome = 'applied'
+            cursor.execute("INSERT IGNORE INTO job_runs (idempotency_key, job, outcome) VALUES (%s, 'reorder', %s)",
+                           (job['key'], outcome))
+            if cursor.rowcount == 0:
+                outcomes[job['key']] = 'duplicate'
+                continue
+            if outcome == 'applied':
+                cursor.execute("UPDATE products SET on_hand_quantity = on_hand_quantity + %s WHERE id = %s",
+                               (product['reorder_quantity'], product['id']))
+                cursor.execute("INSERT INTO stock_ledger (product_id, quantity_change, reason, mo_id) VALUES (%s, %s, %s, %s)",
+                               (product['id'], product['reorder_quantity'], 'Automatic Reorder', job['mo_id']))
+            outcomes[job['key']] = outcome
+        conn.commit()
+        if 'applied' in outcomes.values():
+            bump_versions(conn, 'products', 'stock_ledger')
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    return outcomes
+
+@click.command('reorder-sweep')
+@click.option('--keep-days', type=int, default=7, help='Delete job_runs records older than this.')
+@with_appcontext
+def sweep_command(keep_days):
+    """Queue and apply reorders for every product below its minimum stock."""
+    reorder_queue = current_app.extensions['reorder_queue']
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM products WHERE on_hand_quantity < min_stock_level AND reorder_quantity > 0")
+        product_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute("DELETE FROM job_runs WHERE applied_at < %s", (datetime.now() - timedelta(days=keep_days),))
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+    for product_id in product_ids:
+        reorder_queue.enqueue(product_id)
+    done = reorder_queue.flush()
+    click.echo(f"Queued {len(product_ids)} reorder(s); {'all applied' if done else 'some still pending'}.")
@@ -0,0 +1,68 @@
+import dataclasses
+import decimal
+import json
+from datetime import date, datetime, time, timedelta
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional, stdlib json is the fallback
+    orjson = None
+
+# --- JSON provider ---
+# Encodes DB rows as they come out of the cursor: dates and datetimes as ISO
+# strings ("2024-05-01", "2024-05-01T09:30:00") and DECIMAL columns as numbers.
+# Routes can hand rows to jsonify() without converting fields one by one.
+# orjson is used when installed; otherwise the stdlib encoder produces the
+# same output, only slower.
+
+def _default(obj):
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, timedelta):
+        # MySQL TIME columns arrive as timedelta
+        return obj.total_seconds()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps_bytes(obj, sort_keys=False):
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=option)
+    return json.dumps(obj, default=_default, sort_keys=sort_keys, separators=(',', ':')).encode('utf-8')
+
+def columnar(rows, columns=None):
+    """{"columns": [...], "rows": [[...], ...]} -- column names once instead of per row."""
+    if columns is None:
+        columns = list(rows[0].keys()) if rows else []
+    return {'columns': columns, 'rows': [[row[col] for col in columns] for row in rows]}
+
+class FastJSONProvider(JSONProvider):
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        sort_keys = kwargs.pop('sort_keys', False)
+        if kwargs:
+            # Unusual options (indent, ...) go through the stdlib encoder.
+            kwargs.setdefault('default', _default)
+            return json.dumps(obj, sort_keys=sort_keys, **kwargs)
+        return dumps_bytes(obj, sort_keys=sort_keys).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
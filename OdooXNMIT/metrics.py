@@ -0,0 +1,39 @@
+import threading
+
+# --- In-process counters and timings ---
+# Each worker process keeps its own numbers; /api/metrics reports the
+# worker that served the request.
+_lock = threading.Lock()
+_counters = {}
+_timings = {}
+
+def incr(name, amount=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+def observe(name, value):
+    """Record one sample (e.g. a wait time in ms) under `name`."""
+    with _lock:
+        stats = _timings.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0})
+        stats['count'] += 1
+        stats['total'] += value
+        if value > stats['max']:
+            stats['max'] = value
+
+def snapshot():
+    with _lock:
+        counters = dict(_counters)
+        timings = {
+            name: {
+                'count': stats['count'],
+                'avg': stats['total'] / stats['count'] if stats['count'] else 0.0,
+                'max': stats['max'],
+            }
+            for name, stats in _timings.items()
+        }
+    return {'counters': counters, 'timings': timings}
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _timings.clear()
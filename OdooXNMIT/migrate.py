@@ -0,0 +1,106 @@
+import importlib.util
+import os
+import re
+
+import click
+from flask.cli import with_appcontext
+
+from db import get_db_connection
+
+# --- Schema migrations ---
+# migrations/ holds numbered files applied in name order: NNNN_name.sql
+# (statements separated by ";" at the end of a line) or NNNN_name.py (a
+# module with upgrade(cursor), for changes plain SQL can't make idempotent).
+# Applied versions are recorded in schema_migrations. `flask db-upgrade`
+# applies the pending ones; `flask db-status` lists them.
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+SCHEMA_MIGRATIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version VARCHAR(255) NOT NULL PRIMARY KEY,
+        applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+_MIGRATION_FILE = re.compile(r'^(\d{4})_\w+\.(sql|py)$')
+
+def available_migrations(directory=MIGRATIONS_DIR):
+    """[(version, path)] sorted by version; version is the file name without extension."""
+    found = []
+    for name in sorted(os.listdir(directory)):
+        if _MIGRATION_FILE.match(name):
+            found.append((os.path.splitext(name)[0], os.path.join(directory, name)))
+    return found
+
+def split_statements(sql):
+    # Drop full-line comments, then split on a ";" that ends a line.
+    lines = [line for line in sql.splitlines() if not line.lstrip().startswith('--')]
+    return [stmt.strip() for stmt in re.split(r';\s*$', '\n'.join(lines), flags=re.M) if stmt.strip()]
+
+def applied_versions(cursor):
+    cursor.execute(SCHEMA_MIGRATIONS_DDL)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+def _apply(cursor, path):
+    if path.endswith('.sql'):
+        with open(path, encoding='utf-8') as f:
+            for statement in split_statements(f.read()):
+                cursor.execute(statement)
+    else:
+        spec = importlib.util.spec_from_file_location(os.path.basename(path)[:-3], path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.upgrade(cursor)
+
+def upgrade(conn, directory=MIGRATIONS_DIR, echo=None):
+    """Apply every pending migration in order. Returns the versions applied.
+
+    MySQL commits DDL implicitly, so a migration that fails half-way is not
+    rolled back; it is not recorded either, and the files are written to be
+    safe to re-run (IF NOT EXISTS / existence checks).
+    """
+    cursor = conn.cursor()
+    done = applied_versions(cursor)
+    applied = []
+    for version, path in available_migrations(directory):
+        if version in done:
+            continue
+        if echo:
+            echo(f"Applying {version} ...")
+        _apply(cursor, path)
+        cursor.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+        conn.commit()
+        applied.append(version)
+    cursor.close()
+    return applied
+
+def init_app(app):
+    app.cli.add_command(upgrade_command)
+    app.cli.add_command(status_command)
+
+@click.command('db-upgrade')
+@with_appcontext
+def upgrade_command():
+    """Apply pending schema migrations."""
+    conn = get_db_connection()
+    try:
+        applied = upgrade(conn, echo=click.echo)
+    finally:
+        conn.close()
+    click.echo(f"Applied {len(applied)} migration(s)." if applied else "Schema is up to date.")
+
+@click.command('db-status')
+@with_appcontext
+def status_command():
+    """List schema migrations and whether they are applied."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        done = applied_versions(cursor)
+        cursor.close()
+    finally:
+        conn.close()
+    for version, _ in available_migrations():
+        click.echo(f"[{'x' if version in done else ' '}] {version}")
@@ -0,0 +1,124 @@
+-- Base schema of the manufacturing app. CREATE TABLE IF NOT EXISTS so it can
+-- also be recorded as applied on databases that were created by hand; the
+-- indexes those may be missing are added by 0002.
+
+CREATE TABLE IF NOT EXISTS users (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    email VARCHAR(255) NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    role VARCHAR(32) NOT NULL DEFAULT 'Manager',
+    UNIQUE KEY uq_users_email (email)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS products (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    description TEXT NULL,
+    on_hand_quantity INT NOT NULL DEFAULT 0,
+    min_stock_level INT NOT NULL DEFAULT 0,
+    reorder_quantity INT NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS work_centers (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    cost_per_hour DECIMAL(10, 2) NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS boms (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    product_id INT NOT NULL,
+    CONSTRAINT fk_boms_product FOREIGN KEY (product_id) REFERENCES products (id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS bom_components (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    bom_id INT NOT NULL,
+    component_product_id INT NOT NULL,
+    quantity_required INT NOT NULL,
+    CONSTRAINT fk_bom_components_bom FOREIGN KEY (bom_id) REFERENCES boms (id),
+    CONSTRAINT fk_bom_components_product FOREIGN KEY (component_product_id) REFERENCES products (id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS bom_operations (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    bom_id INT NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    work_center_id INT NOT NULL,
+    duration_minutes INT NOT NULL,
+    CONSTRAINT fk_bom_operations_bom FOREIGN KEY (bom_id) REFERENCES boms (id),
+    CONSTRAINT fk_bom_operations_work_center FOREIGN KEY (work_center_id) REFERENCES work_centers (id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS manufacturing_orders (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    product_id INT NOT NULL,
+    quantity_to_produce INT NOT NULL,
+    bom_id INT NULL,
+    status VARCHAR(32) NOT NULL DEFAULT 'Draft',
+    schedule_start_date DATE NULL,
+    assignee_id INT NULL,
+    start_time DATETIME NULL,
+    completed_at DATETIME NULL,
+    CONSTRAINT fk_mo_product FOREIGN KEY (product_id) REFERENCES products (id),
+    CONSTRAINT fk_mo_bom FOREIGN KEY (bom_id) REFERENCES boms (id),
+    CONSTRAINT fk_mo_assignee FOREIGN KEY (assignee_id) REFERENCES users (id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS work_orders (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    mo_id INT NOT NULL,
+    operation_name VARCHAR(255) NOT NULL,
+    work_center_id INT NOT NULL,
+    status VARCHAR(32) NOT NULL DEFAULT 'To Do',
+    duration_minutes INT NULL,
+    start_time DATETIME NULL,
+    end_time DATETIME NULL,
+    real_duration_minutes INT NULL,
+    CONSTRAINT fk_wo_mo FOREIGN KEY (mo_id) REFERENCES manufacturing_orders (id),
+    CONSTRAINT fk_wo_work_center FOREIGN KEY (work_center_id) REFERENCES work_centers (id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS manufacturing_order_status_history (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    mo_id INT NOT NULL,
+    status VARCHAR(32) NOT NULL,
+    timestamp DATETIME NOT NULL,
+    CONSTRAINT fk_mo_history_mo FOREIGN KEY (mo_id) REFERENCES manufacturing_orders (id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- mo_id has no foreign key on purpose: ledger rows are an audit trail and
+-- must not block removing or archiving the order they came from.
+CREATE TABLE IF NOT EXISTS stock_ledger (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    product_id INT NOT NULL,
+    quantity_change INT NOT NULL,
+    reason VARCHAR(64) NOT NULL,
+    mo_id INT NULL,
+    timestamp DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_stock_ledger_product FOREIGN KEY (product_id) REFERENCES products (id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Per-table change counters behind the ETags (http_cache.py).
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name VARCHAR(64) NOT NULL PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Flat work-order list projection (read_models.py).
+CREATE TABLE IF NOT EXISTS work_order_list (
+    wo_id INT NOT NULL PRIMARY KEY,
+    mo_id INT NOT NULL,
+    work_center_id INT NOT NULL,
+    product_id INT NOT NULL,
+    operation_name VARCHAR(255) NOT NULL,
+    work_center_name VARCHAR(255) NOT NULL,
+    finished_product_name VARCHAR(255) NOT NULL,
+    status VARCHAR(32) NOT NULL,
+    duration_minutes INT NULL,
+    real_duration_minutes INT NULL,
+    start_time DATETIME NULL,
+    end_time DATETIME NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,43 @@
+"""Indexes for the queries the app runs on every page load.
+
+Written in Python rather than SQL because MySQL has no ADD INDEX IF NOT
+EXISTS, and hand-made databases may already have some of these.
+"""
+
+INDEXES = [
+    # Dashboard KPI counts and filters: status = ?, status = 'Confirmed' AND schedule_start_date < CURDATE()
+    ('manufacturing_orders', 'idx_mo_status_schedule', 'status, schedule_start_date'),
+    # "My" counts/filters and "Not Assigned" (assignee_id IS NULL)
+    ('manufacturing_orders', 'idx_mo_assignee_status', 'assignee_id, status, schedule_start_date'),
+    # Dashboard list ORDER BY schedule_start_date DESC
+    ('manufacturing_orders', 'idx_mo_schedule', 'schedule_start_date'),
+    # Component availability / consumption: bom_id = ? (covering)
+    ('bom_components', 'idx_bom_components_bom', 'bom_id, component_product_id, quantity_required'),
+    ('bom_operations', 'idx_bom_operations_bom', 'bom_id'),
+    ('boms', 'idx_boms_product', 'product_id'),
+    # MO snapshot and "all work orders done?" checks: mo_id = ?
+    ('work_orders', 'idx_work_orders_mo_status', 'mo_id, status'),
+    ('work_orders', 'idx_work_orders_center_status', 'work_center_id, status'),
+    ('manufacturing_order_status_history', 'idx_mo_history_mo_time', 'mo_id, timestamp'),
+    # Stock ledger page ORDER BY timestamp DESC, per-product history, MO consumption lookups
+    ('stock_ledger', 'idx_stock_ledger_time', 'timestamp'),
+    ('stock_ledger', 'idx_stock_ledger_product_time', 'product_id, timestamp'),
+    ('stock_ledger', 'idx_stock_ledger_mo', 'mo_id'),
+    # update_stock looks products up by name
+    ('products', 'idx_products_name', 'name'),
+    # work_order_list page filters (read_models.list_work_orders)
+    ('work_order_list', 'idx_wol_center_status', 'work_center_id, status, wo_id'),
+    ('work_order_list', 'idx_wol_status', 'status, wo_id'),
+    ('work_order_list', 'idx_wol_mo', 'mo_id'),
+    ('work_order_list', 'idx_wol_product', 'product_id'),
+]
+
+def upgrade(cursor):
+    cursor.execute("""
+        SELECT table_name, index_name FROM information_schema.statistics
+        WHERE table_schema = DATABASE()
+    """)
+    existing = {(table.lower(), index.lower()) for table, index in cursor.fetchall()}
+    for table, index, columns in INDEXES:
+        if (table.lower(), index.lower()) not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD INDEX {index} ({columns})")
@@ -0,0 +1,13 @@
+-- Cold copies of the tables `flask archive` moves finished orders and old
+-- ledger rows into (archive.py). LIKE copies the columns and indexes but not
+-- the foreign keys, so archived rows don't pin products or users. The
+-- columns must stay identical to the hot tables (reads UNION ALL both and
+-- the archiver copies with SELECT *): later column changes go to both.
+
+CREATE TABLE IF NOT EXISTS manufacturing_orders_archive LIKE manufacturing_orders;
+
+CREATE TABLE IF NOT EXISTS work_orders_archive LIKE work_orders;
+
+CREATE TABLE IF NOT EXISTS manufacturing_order_status_history_archive LIKE manufacturing_order_status_history;
+
+CREATE TABLE IF NOT EXISTS stock_ledger_archive LIKE stock_ledger;
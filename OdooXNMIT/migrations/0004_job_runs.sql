@@ -0,0 +1,11 @@
+-- Idempotency keys of background jobs (jobs.py). A key is inserted in the
+-- same transaction as the job's effect, so a retried job is applied at most
+-- once. `flask reorder-sweep` prunes old rows.
+
+CREATE TABLE IF NOT EXISTS job_runs (
+    idempotency_key VARCHAR(64) NOT NULL PRIMARY KEY,
+    job VARCHAR(32) NOT NULL,
+    outcome VARCHAR(16) NOT NULL,
+    applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_job_runs_applied (applied_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
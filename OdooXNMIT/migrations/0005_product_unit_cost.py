@@ -0,0 +1,9 @@
+"""products.unit_cost: purchase cost of one unit, used by the BOM cost roll-up (costing.py)."""
+
+def upgrade(cursor):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = 'products' AND column_name = 'unit_cost'
+    """)
+    if cursor.fetchone()[0] == 0:
+        cursor.execute("ALTER TABLE products ADD COLUMN unit_cost DECIMAL(12, 4) NOT NULL DEFAULT 0")
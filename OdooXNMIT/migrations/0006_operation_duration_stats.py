@@ -0,0 +1,33 @@
+"""Running duration statistics per (BOM operation, work center) (duration_stats.py).
+
+work_orders (and, to keep the columns identical, work_orders_archive) get
+the bom_operation_id they were created from; work orders created before
+this migration have none and don't feed the statistics.
+"""
+
+def _has_column(cursor, table, column):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (table, column))
+    return cursor.fetchone()[0] > 0
+
+def upgrade(cursor):
+    for table in ('work_orders', 'work_orders_archive'):
+        if not _has_column(cursor, table, 'bom_operation_id'):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN bom_operation_id INT NULL")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS operation_duration_stats (
+            bom_operation_id INT NOT NULL,
+            work_center_id INT NOT NULL,
+            sample_count INT NOT NULL DEFAULT 0,
+            mean_minutes DOUBLE NOT NULL DEFAULT 0,
+            m2 DOUBLE NOT NULL DEFAULT 0,
+            ewma_minutes DOUBLE NULL,
+            min_minutes DOUBLE NULL,
+            max_minutes DOUBLE NULL,
+            sketch TEXT NULL,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (bom_operation_id, work_center_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
@@ -0,0 +1,10 @@
+-- Per-user revocations of cached session claims (user_cache.py). A row
+-- means claims of that user issued at or before `revoked_at` (a Unix
+-- timestamp, same clock as the claims' `iat`) must be re-read from users.
+-- Rows older than the claims TTL no longer matter and are pruned on write.
+
+CREATE TABLE IF NOT EXISTS user_revocations (
+    user_id INT NOT NULL PRIMARY KEY,
+    revoked_at DOUBLE NOT NULL,
+    KEY idx_user_revocations_revoked (revoked_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,13 @@
+"""Fill work_order_list (read_models.py) from the existing work orders.
+
+0001 creates the table empty, so databases that already had work orders
+would show an empty /work-orders page until a manual rebuild. REPLACE
+keeps this safe to re-run; the work_orders version is bumped so cached
+copies of the page are not served.
+"""
+from http_cache import bump_versions_sql
+from read_models import COLUMNS, JOINED_VIEW_SQL
+
+def upgrade(cursor):
+    cursor.execute(f"REPLACE INTO work_order_list ({', '.join(COLUMNS)}) {JOINED_VIEW_SQL}")
+    cursor.execute(*bump_versions_sql(('work_orders',)))
@@ -0,0 +1,116 @@
+import hmac
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+import metrics
+
+# --- Off-thread password hashing ---
+# bcrypt is CPU-bound on purpose. Running it inline on a request thread holds
+# the worker for the whole hash, so a burst of logins stalls every other page.
+# PasswordHasher runs it on a small process pool instead and refuses new work
+# once `max_queue` hashes are already waiting, so a login storm gets a fast
+# "try again" instead of queueing forever.
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full."""
+
+def _hash_password(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+def _check_password(pw_hash, password):
+    pw_hash = pw_hash.encode('utf-8')
+    return hmac.compare_digest(bcrypt.hashpw(password.encode('utf-8'), pw_hash), pw_hash)
+
+def hash_rounds(pw_hash):
+    """Cost factor stored in a bcrypt hash ("$2b$12$..." -> 12)."""
+    try:
+        return int(pw_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+class PasswordHasher:
+    def __init__(self, workers=2, max_queue=32, rounds=12, timeout=10):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._slots = threading.BoundedSemaphore(max_queue)
+
+    def init_app(self, app):
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', self.workers)
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', self.rounds)
+        self.max_queue = app.config.get('PASSWORD_HASH_MAX_QUEUE', self.max_queue)
+        self._slots = threading.BoundedSemaphore(self.max_queue)
+
+    def _get_executor(self):
+        # The pool is created lazily and re-created after a fork, so every
+        # server worker process owns its own hashing processes.
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # Not fork: the gthread worker forking this has other threads
+                # (and their locks) that must not be copied into the children.
+                method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context(method))
+                self._pid = os.getpid()
+            return self._executor
+
+    def _discard(self, executor):
+        # A worker process died; the next call starts a fresh pool.
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            metrics.incr('password_hashing.rejected')
+            raise HashingBusy('Too many password operations in progress')
+        executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool as e:
+            self._slots.release()
+            self._discard(executor)
+            metrics.incr('password_hashing.broken_pool')
+            raise HashingBusy('Password hashing pool is restarting') from e
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        metrics.incr('password_hashing.submitted')
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout as e:
+            metrics.incr('password_hashing.timed_out')
+            raise HashingBusy('Password operation timed out') from e
+        except BrokenProcessPool as e:
+            self._discard(executor)
+            metrics.incr('password_hashing.broken_pool')
+            raise HashingBusy('Password hashing pool is restarting') from e
+
+    def generate(self, password):
+        if not password:
+            raise ValueError('Password must be non-empty.')
+        return self._run(_hash_password, password, self.rounds)
+
+    def check(self, pw_hash, password):
+        return self._run(_check_password, pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        return hash_rounds(pw_hash) != self.rounds
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=wait)
+            self._executor = None
+            self._pid = None
@@ -0,0 +1,89 @@
+# --- SQL shared by the Flask routes and the async API ---
+# Both mysql.connector and aiomysql use the %s paramstyle, so the same
+# strings run on either driver.
+
+import re
+
+MO_STATUSES = ['Draft', 'Confirmed', 'In Progress', 'Done']
+
+MO_HEADER_SQL = """
+    SELECT mo.*, p.name AS product_name, b.name AS bom_name, u.name AS assignee_name
+    FROM manufacturing_orders mo
+    JOIN products p ON mo.product_id = p.id
+    LEFT JOIN boms b ON mo.bom_id = b.id
+    LEFT JOIN users u ON mo.assignee_id = u.id
+    WHERE mo.id = %s
+"""
+
+MO_COMPONENTS_SQL = """
+    SELECT p.name AS component_name, p.on_hand_quantity, (bc.quantity_required * mo.quantity_to_produce) AS to_consume
+    FROM manufacturing_orders mo
+    JOIN bom_components bc ON mo.bom_id = bc.bom_id
+    JOIN products p ON bc.component_product_id = p.id
+    WHERE mo.id = %s
+"""
+
+MO_WORK_ORDERS_SQL = """
+    SELECT wo.*, wc.name AS work_center_name
+    FROM work_orders wo
+    JOIN work_centers wc ON wo.work_center_id = wc.id
+    WHERE wo.mo_id = %s
+"""
+
+MO_HISTORY_SQL = "SELECT status, timestamp FROM manufacturing_order_status_history WHERE mo_id = %s ORDER BY timestamp"
+
+LOG_MO_STATUS_SQL = "INSERT INTO manufacturing_order_status_history (mo_id, status, timestamp) VALUES (%s, %s, %s)"
+
+def mark_component_availability(components):
+    for comp in components:
+        comp['availability_status'] = 'Available' if comp['on_hand_quantity'] >= comp['to_consume'] else 'Not Available'
+    return components
+
+# --- Hot / archive tables ---
+# `flask archive` (archive.py) moves finished orders, their work orders and
+# history, and old ledger rows into *_archive tables with identical columns.
+# Pages read the hot tables; include_archive reads both through UNION ALL.
+
+def table_source(table, include_archive=False):
+    if not include_archive:
+        return table
+    return f"(SELECT * FROM {table} UNION ALL SELECT * FROM {table}_archive)"
+
+_MO_TABLES = re.compile(r'\b(manufacturing_orders|work_orders|manufacturing_order_status_history)\b')
+
+def archived(sql):
+    """`sql` reading the archived copies of the MO tables instead of the hot ones."""
+    return _MO_TABLES.sub(r'\1_archive', sql)
+
+def build_mo_list_query(active_filter, search_query, filter_owner, user_id, include_archive=False):
+    """Dashboard / API list of manufacturing orders. Returns (sql, params)."""
+    base_query = f"SELECT mo.id, mo.schedule_start_date, mo.quantity_to_produce, mo.status, mo.bom_id, p.name as product_name FROM {table_source('manufacturing_orders', include_archive)} mo JOIN products p ON mo.product_id = p.id"
+    where_clauses = []
+    params = []
+    if filter_owner == 'my':
+        where_clauses.append("mo.assignee_id = %s")
+        params.append(user_id)
+    if active_filter in MO_STATUSES:
+        where_clauses.append("mo.status = %s")
+        params.append(active_filter)
+    elif active_filter == 'Late':
+        where_clauses.append("mo.schedule_start_date < CURDATE() AND mo.status = 'Confirmed'")
+    elif active_filter == 'Not Assigned':
+        where_clauses.append("mo.assignee_id IS NULL")
+    if search_query:
+        where_clauses.append("(p.name LIKE %s OR mo.status LIKE %s OR mo.id LIKE %s)")
+        search_term = f"%{search_query}%"
+        params.extend([search_term, search_term, search_query.replace('MO-', '')])
+    if where_clauses:
+        base_query += " WHERE " + " AND ".join(where_clauses)
+    base_query += " ORDER BY mo.schedule_start_date DESC"
+    return base_query, tuple(params)
+
+def build_stock_ledger_query(include_archive=False):
+    """Stock ledger page, newest first."""
+    return f"""
+        SELECT s.id, s.timestamp, s.quantity_change, s.reason, p.name as product_name
+        FROM {table_source('stock_ledger', include_archive)} s
+        JOIN products p ON s.product_id = p.id
+        ORDER BY s.timestamp DESC
+    """
@@ -0,0 +1,128 @@
+import click
+from flask.cli import with_appcontext
+
+from db import get_db_connection
+from http_cache import bump_versions
+
+# --- Work-order list read model ---
+# work_order_list holds one flat row per work order with everything the
+# /work-orders page shows, so the page is a single indexed range scan instead
+# of a four-table join over all history. The write paths that change any of
+# those columns update it in the same transaction:
+#   add_manufacturing_order        -> refresh_mo
+#   start/complete work order      -> refresh_work_order
+#   product / work-center renames  -> rename_product / rename_work_center
+# `flask rebuild-work-order-list` rebuilds it from the joined view and
+# `--verify` reports rows that drifted. The table and its indexes come from
+# the migrations (0001 / 0002); 0008 fills it from existing work orders.
+
+COLUMNS = ('wo_id', 'mo_id', 'work_center_id', 'product_id', 'operation_name', 'work_center_name',
+           'finished_product_name', 'status', 'duration_minutes', 'real_duration_minutes',
+           'start_time', 'end_time')
+
+JOINED_VIEW_SQL = """
+    SELECT wo.id AS wo_id, wo.mo_id, wo.work_center_id, mo.product_id, wo.operation_name,
+           wc.name AS work_center_name, p.name AS finished_product_name, wo.status,
+           wo.duration_minutes, wo.real_duration_minutes, wo.start_time, wo.end_time
+    FROM work_orders wo
+    JOIN work_centers wc ON wo.work_center_id = wc.id
+    JOIN manufacturing_orders mo ON wo.mo_id = mo.id
+    JOIN products p ON mo.product_id = p.id
+"""
+
+def init_app(app):
+    app.cli.add_command(rebuild_command)
+
+def _project(cursor, where_sql, params):
+    cursor.execute(
+        f"REPLACE INTO work_order_list ({', '.join(COLUMNS)}) {JOINED_VIEW_SQL} WHERE {where_sql}",
+        params
+    )
+
+def refresh_mo(cursor, mo_id):
+    _project(cursor, "wo.mo_id = %s", (mo_id,))
+
+def refresh_work_order(cursor, wo_id):
+    _project(cursor, "wo.id = %s", (wo_id,))
+
+def rename_product(cursor, product_id, name):
+    cursor.execute("UPDATE work_order_list SET finished_product_name = %s WHERE product_id = %s", (name, product_id))
+
+def rename_work_center(cursor, work_center_id, name):
+    cursor.execute("UPDATE work_order_list SET work_center_name = %s WHERE work_center_id = %s", (name, work_center_id))
+
+def list_work_orders(cursor, search_query='', work_center_id=None, status=None, page=1, per_page=50):
+    """One page of the work-order list, newest first. Returns (rows, has_next)."""
+    query = """
+        SELECT wo_id AS id, operation_name, duration_minutes, real_duration_minutes, status,
+               work_center_name, finished_product_name, mo_id, start_time, end_time
+        FROM work_order_list
+    """
+    where_clauses = []
+    params = []
+    if work_center_id:
+        where_clauses.append("work_center_id = %s")
+        params.append(work_center_id)
+    if status:
+        where_clauses.append("status = %s")
+        params.append(status)
+    if search_query:
+        where_clauses.append("(operation_name LIKE %s OR work_center_name LIKE %s OR finished_product_name LIKE %s OR status LIKE %s)")
+        search_term = f"%{search_query}%"
+        params.extend([search_term, search_term, search_term, search_term])
+    if where_clauses:
+        query += " WHERE " + " AND ".join(where_clauses)
+    # Fetch one extra row to know whether a next page exists without a COUNT(*).
+    query += " ORDER BY wo_id DESC LIMIT %s OFFSET %s"
+    params.extend([per_page + 1, (page - 1) * per_page])
+    cursor.execute(query, tuple(params))
+    rows = cursor.fetchall()
+    return rows[:per_page], len(rows) > per_page
+
+def rebuild(conn):
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM work_order_list")
+    cursor.execute(f"INSERT INTO work_order_list ({', '.join(COLUMNS)}) {JOINED_VIEW_SQL}")
+    count = cursor.rowcount
+    conn.commit()
+    cursor.close()
+    bump_versions(conn, 'work_orders')
+    return count
+
+def verify(conn):
+    """Compare the projection with the joined view. Returns (missing, stale, orphaned) wo ids."""
+    cursor = conn.cursor()
+    mismatch = ' OR '.join(f"NOT (v.{col} <=> l.{col})" for col in COLUMNS[1:])
+    cursor.execute(f"""
+        SELECT v.wo_id, l.wo_id IS NULL
+        FROM ({JOINED_VIEW_SQL}) v
+        LEFT JOIN work_order_list l ON l.wo_id = v.wo_id
+        WHERE l.wo_id IS NULL OR {mismatch}
+    """)
+    missing, stale = [], []
+    for wo_id, is_missing in cursor.fetchall():
+        (missing if is_missing else stale).append(wo_id)
+    cursor.execute("SELECT l.wo_id FROM work_order_list l LEFT JOIN work_orders wo ON wo.id = l.wo_id WHERE wo.id IS NULL")
+    orphaned = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    return missing, stale, orphaned
+
+@click.command('rebuild-work-order-list')
+@click.option('--verify', 'verify_only', is_flag=True, help='Only compare the projection with the joined view.')
+@with_appcontext
+def rebuild_command(verify_only):
+    """Rebuild (or verify) the work_order_list projection."""
+    conn = get_db_connection()
+    try:
+        if not verify_only:
+            click.echo(f"Rebuilt work_order_list with {rebuild(conn)} rows.")
+        missing, stale, orphaned = verify(conn)
+    finally:
+        conn.close()
+    if missing or stale or orphaned:
+        click.echo(f"Mismatch: {len(missing)} missing, {len(stale)} stale, {len(orphaned)} orphaned rows.")
+        for label, ids in (('missing', missing), ('stale', stale), ('orphaned', orphaned)):
+            if ids:
+                click.echo(f"  {label}: {', '.join(str(i) for i in ids[:20])}{' ...' if len(ids) > 20 else ''}")
+        raise SystemExit(1)
+    click.echo("work_order_list matches the joined view.")
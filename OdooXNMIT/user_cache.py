@@ -0,0 +1,125 @@
+import threading
+import time
+
+from flask import session
+
+import metrics
+from db import get_db_connection
+
+# --- Session-backed user identity cache ---
+# After login the user's identity (id, name, email, role) is stored as claims
+# inside Flask's signed session cookie. load_user trusts those claims for
+# `ttl` seconds and only goes back to the users table when they expire, when
+# they belong to another user id, or when they were revoked.
+#
+# Revocations are per user and shared by all worker processes through the
+# user_revocations table (migrations/0007): revoke() records when a user's
+# claims stopped being valid, and claims issued at or before that time are
+# re-read from the users table. Each process refreshes its copy of the
+# recent revocations at most once every `revocation_interval` seconds, so a
+# logout reaches the other workers within that interval without touching
+# anybody else's cached claims.
+
+CLAIMS_KEY = '_user_claims'
+
+class UserCache:
+    def __init__(self, ttl=60, revocation_interval=5):
+        self.ttl = ttl
+        self.revocation_interval = revocation_interval
+        self._lock = threading.Lock()
+        # user id -> revoked_at, for revocations younger than the TTL
+        self._revoked_at = {}
+        self._revocations_read_at = None
+
+    def init_app(self, app):
+        self.ttl = app.config.get('USER_CLAIMS_TTL', self.ttl)
+        self.revocation_interval = app.config.get('USER_CLAIMS_REVOCATION_INTERVAL', self.revocation_interval)
+
+    def _revocations(self):
+        with self._lock:
+            if (self._revocations_read_at is not None
+                    and time.monotonic() - self._revocations_read_at < self.revocation_interval):
+                return self._revoked_at
+        # Older revocations only concern claims that have expired anyway.
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT user_id, revoked_at FROM user_revocations WHERE revoked_at > %s",
+                           (time.time() - self.ttl,))
+            revoked_at = {str(user_id): at for user_id, at in cursor.fetchall()}
+            cursor.close()
+        finally:
+            conn.close()
+        metrics.incr('user_cache.revocation_reads')
+        with self._lock:
+            self._revoked_at = revoked_at
+            self._revocations_read_at = time.monotonic()
+        return revoked_at
+
+    def store(self, user_data):
+        """Write fresh claims for `user_data` (a users row) into the session."""
+        claims = {
+            'id': user_data['id'],
+            'name': user_data['name'],
+            'email': user_data['email'],
+            'role': user_data.get('role'),
+            'iat': time.time(),
+        }
+        session[CLAIMS_KEY] = claims
+        return claims
+
+    def lookup(self, user_id):
+        """Return cached claims for `user_id`, or None when the DB must be asked."""
+        metrics.incr('user_cache.lookups')
+        claims = session.get(CLAIMS_KEY)
+        if not claims or str(claims.get('id')) != str(user_id):
+            metrics.incr('user_cache.misses')
+            return None
+        issued_at = claims.get('iat', 0)
+        if time.time() - issued_at > self.ttl:
+            metrics.incr('user_cache.expired')
+            return None
+        revoked_at = self._revocations().get(str(user_id))
+        if revoked_at is not None and issued_at <= revoked_at:
+            metrics.incr('user_cache.revoked')
+            return None
+        metrics.incr('user_cache.hits')
+        return claims
+
+    def record_db_hit(self):
+        metrics.incr('user_cache.db_hits')
+
+    def revoke(self, user_id):
+        """Send the next request of every session of `user_id` back to the users table, in every worker."""
+        now = time.time()
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO user_revocations (user_id, revoked_at) VALUES (%s, %s) "
+                "ON DUPLICATE KEY UPDATE revoked_at = VALUES(revoked_at)",
+                (user_id, now)
+            )
+            cursor.execute("DELETE FROM user_revocations WHERE revoked_at < %s", (now - self.ttl,))
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+        with self._lock:
+            self._revoked_at = dict(self._revoked_at, **{str(user_id): now})
+
+    def clear_session(self):
+        session.pop(CLAIMS_KEY, None)
+
+    def stats(self):
+        counters = metrics.snapshot()['counters']
+        lookups = counters.get('user_cache.lookups', 0)
+        # Refreshing the revocations is a DB query too.
+        db_hits = counters.get('user_cache.db_hits', 0) + counters.get('user_cache.revocation_reads', 0)
+        return {
+            'lookups': lookups,
+            'hits': counters.get('user_cache.hits', 0),
+            'db_hits': db_hits,
+            'db_hits_per_request': db_hits / lookups if lookups else 0.0,
+            'ttl_seconds': self.ttl,
+        }
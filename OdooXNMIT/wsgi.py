@@ -0,0 +1,6 @@
+"""Production entry point: gunicorn -c gunicorn.conf.py wsgi:application"""
+import os
+
+from app import create_app
+
+application = create_app(os.getenv('APP_CONFIG', 'production'))
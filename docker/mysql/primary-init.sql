@@ -0,0 +1,6 @@
+-- Runs once when the primary's data directory is created.
+CREATE USER IF NOT EXISTS 'repl'@'%' IDENTIFIED BY 'repl';
+GRANT REPLICATION SLAVE ON *.* TO 'repl'@'%';
+-- Both containers create the database and app user themselves; start the
+-- binary log clean so the replica doesn't replay those.
+RESET MASTER;
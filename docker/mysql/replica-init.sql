@@ -0,0 +1,9 @@
+-- Runs once when the replica's data directory is created.
+CHANGE REPLICATION SOURCE TO
+    SOURCE_HOST = 'mysql-primary',
+    SOURCE_PORT = 3306,
+    SOURCE_USER = 'repl',
+    SOURCE_PASSWORD = 'repl',
+    SOURCE_AUTO_POSITION = 1,
+    GET_SOURCE_PUBLIC_KEY = 1;
+START REPLICA;